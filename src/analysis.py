@@ -0,0 +1,248 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import Counter
+
+from cellkey import LOW, SHIFT, offset, unpack
+from cycles import CycleDetector
+from engine import Engine
+from patterns import read_rle
+from rules import parse
+from shapes import MAX_PERIOD, OBJECT_DISTANCE, canonical
+
+# Objects recognized by the census, as RLE of one of their phases. The other phases are computed with the rule,
+# and the objects which don't repeat with it are left out.
+OBJECTS = {
+    "block": "2o$2o!",
+    "beehive": "b2o$o2bo$b2o!",
+    "loaf": "b2o$o2bo$bobo$2bo!",
+    "boat": "2o$obo$bo!",
+    "ship": "2o$obo$b2o!",
+    "tub": "bo$obo$bo!",
+    "pond": "b2o$o2bo$o2bo$b2o!",
+    "barge": "bo$obo$bobo$2bo!",
+    "blinker": "3o!",
+    "toad": "b3o$3o!",
+    "beacon": "2o$2o$2b2o$2b2o!",
+    "pulsar": "2b3o3b3o2$o4bobo4bo$o4bobo4bo$o4bobo4bo$2b3o3b3o2$2b3o3b3o$o4bobo4bo$o4bobo4bo$o4bobo4bo2$2b3o3b3o!",
+    "pentadecathlon": "2bo4bo$2ob4ob2o$2bo4bo!",
+    "glider": "bo$2bo$3o!",
+    "lwss": "bo2bo$o$o3bo$4o!",
+    "mwss": "3bo$bo3bo$o$o4bo$5o!",
+    "hwss": "3b2o$bo4bo$o$o5bo$6o!",
+}
+# Name of the components matching none of the objects
+UNKNOWN = "other"
+# Maximum number of shapes whose name is remembered, see Census.__classify()
+SHAPES_CACHE_SIZE = 65536
+
+# Canonical forms of the phases of the objects by rule, built once
+_tables = {}
+
+
+def object_table(rule=None):
+    """
+    :param rule: Life-like rule, see rules.parse()
+    :return: A dict of the objects names by canonical form of their phases, see shapes.canonical()
+    """
+    rule = parse(rule)
+    table = _tables.get(str(rule))
+    if table is not None:
+        return table
+
+    table = {}
+    for name, rle in OBJECTS.items():
+        cells = list(read_rle(rle.encode()))
+        engine = Engine(cells, rule)
+        detector = CycleDetector(engine, MAX_PERIOD + 1)
+        forms = [canonical(cells)]
+        for _ in range(MAX_PERIOD):
+            engine.step()
+            if not engine.population:
+                # Objects dying under this rule are left out too
+                cycle = None
+                break
+            cycle = detector.update()
+            if cycle is not None:
+                break
+            forms.append(canonical(engine.cells()))
+        else:
+            continue
+        if cycle is not None and cycle.start == 0:
+            for form in forms:
+                table.setdefault(form, name)
+
+    _tables[str(rule)] = table
+    return table
+
+
+class Census:
+
+    def __init__(self, keys=(), rule=None, distance=OBJECT_DISTANCE):
+        """
+        Objects of the board, kept up to date with the births and deaths of each generation.
+
+        Cells closer than distance belong to the same component, like shapes.objects(). Components are joined with
+        a union-find as cells are born, and a component losing cells is rebuilt from its remaining ones, so an
+        update costs the changes and the size of the components they touch, not the population.
+        The components which changed are then looked up by canonical form in object_table().
+
+        :param keys: iterable of the keys of the living cells
+        :param rule: Life-like rule of the simulation, see rules.parse()
+        :param distance: cells closer than this (in both directions) belong to the same component
+        """
+        self.table = object_table(rule)
+        self.around = tuple(
+            offset(dx, dy) for dy in range(-distance, distance + 1) for dx in range(-distance, distance + 1) if dx or dy
+        )
+        # Components of other populations can't be in the table, so they aren't looked up
+        self.populations = {_population(form) for form in self.table}
+        # Names by shape of the components moved to (0, 0), since the same shapes come back every period
+        self.shapes = {}
+        self.reset(keys)
+
+    def reset(self, keys=()):
+        """
+        Forget all the cells and compute the components of new ones
+        """
+        # Parent of each cell in the union-find, and cells and name of each component by root
+        self.parent = {}
+        self.members = {}
+        self.names = {}
+        self.counts = Counter()
+        # Copy of counts made after each update, which another thread can read while updating
+        self.snapshot = Counter()
+        self.update(keys, ())
+
+    def __len__(self):
+        return len(self.members)
+
+    def find(self, key):
+        """
+        :return: The root of the component of a living cell
+        """
+        parent = self.parent
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    def component(self, key):
+        """
+        :return: The set of the keys of the component of a living cell
+        """
+        return self.members[self.find(key)]
+
+    def update(self, births, deaths):
+        """
+        :param births: keys of the cells born since the last update
+        :param deaths: keys of the cells dead since the last update
+        """
+        parent, members = self.parent, self.members
+        deaths = set(deaths)
+
+        # A component losing cells may split: it's rebuilt from its remaining cells
+        changed = []
+        for root in {self.find(key) for key in deaths if key in parent}:
+            self.__forget(root)
+            cells = members.pop(root)
+            for key in cells:
+                del parent[key]
+            for group in self.__split(cells - deaths):
+                root = next(iter(group))
+                for key in group:
+                    parent[key] = root
+                members[root] = group
+                changed.append(root)
+
+        # Born cells join the components around them
+        for key in births:
+            if key in parent:
+                continue
+            parent[key] = key
+            members[key] = {key}
+            root = key
+            for around in self.around:
+                if key + around in parent:
+                    other = self.find(key + around)
+                    if other != root:
+                        root = self.__union(root, other)
+            changed.append(root)
+
+        for root in {self.find(key) for key in changed}:
+            self.__forget(root)
+            name = self.__classify(members[root])
+            self.names[root] = name
+            self.counts[name] += 1
+        self.snapshot = self.counts.copy()
+
+    def __split(self, keys):
+        """
+        :param keys: set of keys of living cells, emptied
+        :return: A list of the sets of keys of the components the cells form by themselves
+        """
+        groups = []
+        while keys:
+            stack = [keys.pop()]
+            group = set(stack)
+            while stack:
+                key = stack.pop()
+                for around in self.around:
+                    if key + around in keys:
+                        keys.remove(key + around)
+                        group.add(key + around)
+                        stack.append(key + around)
+            groups.append(group)
+        return groups
+
+    def __union(self, a, b):
+        """
+        Join the components of two different roots
+
+        :return: The root of the joined component
+        """
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.__forget(a)
+        self.__forget(b)
+        self.parent[b] = a
+        self.members[a] |= self.members.pop(b)
+        return a
+
+    def __forget(self, root):
+        """
+        Remove the component from the counts, until it's classified again
+        """
+        name = self.names.pop(root, None)
+        if name is not None:
+            self.counts[name] -= 1
+            if not self.counts[name]:
+                del self.counts[name]
+
+    def __classify(self, keys):
+        if len(keys) not in self.populations:
+            return UNKNOWN
+
+        base = (min(key >> SHIFT for key in keys) << SHIFT) | min(key & LOW for key in keys)
+        shape = frozenset(key - base for key in keys)
+        name = self.shapes.get(shape)
+        if name is None:
+            if len(self.shapes) >= SHAPES_CACHE_SIZE:
+                self.shapes.clear()
+            name = self.shapes[shape] = self.table.get(canonical(map(unpack, keys)), UNKNOWN)
+        return name
+
+
+def _population(form):
+    """
+    :param form: shapes.pattern_code() of cells
+    :return: The number of cells
+    """
+    return sum(bin(int(row, 16)).count("1") for row in form.split("-"))
@@ -0,0 +1,268 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from engine import ENGINES, create_engine
+from patterns import read_rle
+from rules import parse
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then not reported
+    resource = None
+
+# Headless benchmark of the engines: each workload is run on each engine in a new process, timing every step()
+# and the births and deaths a view would draw, and the results are written as JSON.
+#   python benchmark.py --engines sparse tiled --generations 200 --output results.json
+#   python benchmark.py --baseline results.json
+
+# Patterns of the workloads, in RLE
+PATTERNS = {
+    "r-pentomino": b"b2o$2o$bo!",
+    "acorn": b"bo5b$3bo3b$2o2b3o!",
+    "gosper-gun": b"24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4bobo$10bo5bo7bo$"
+                  b"11bo3bo$12b2o!",
+}
+SOUP_SIZES = (64, 256)
+SOUP_DENSITIES = (0.2, 0.35, 0.5)
+SOUP_SEED = 1
+GENERATIONS = 100
+# Number of generations run again with tracemalloc, which slows everything down, to measure the allocations
+ALLOCATION_GENERATIONS = 10
+PERCENTILES = (50, 90, 99)
+
+
+def workloads(sizes=SOUP_SIZES, densities=SOUP_DENSITIES):
+    """
+    :return: The names of the workloads: the PATTERNS, and soups named soup-<size>-<density>
+    """
+    return list(PATTERNS) + [f"soup-{size}-{density}" for size in sizes for density in densities]
+
+
+def setup(engine_name, workload, rule=None):
+    """
+    :param rule: Life-like rule, see rules.parse()
+    :return: A new engine of the given kind holding the cells of the workload
+    """
+    if workload in PATTERNS:
+        return create_engine(engine_name, read_rle(PATTERNS[workload]), rule=rule)
+
+    _, size, density = workload.split("-")
+    engine = create_engine(engine_name, rule=rule)
+    engine.random_fill(0, 0, int(size) - 1, int(size) - 1, float(density), SOUP_SEED)
+    return engine
+
+
+def close(engine):
+    if hasattr(engine, "close"):
+        engine.close()
+
+
+def summary(latencies):
+    """
+    :param latencies: durations in seconds
+    :return: A dict of the percentiles and maximum of the durations, in ms
+    """
+    latencies = sorted(latencies)
+    if not latencies:
+        return {}
+    result = {f"p{p}": latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000 for p in PERCENTILES}
+    result["max"] = latencies[-1] * 1000
+    return result
+
+
+def peak_rss():
+    """
+    :return: The peak resident set size of the process in bytes, None if unknown
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def environment():
+    """
+    :return: A dict describing the machine and Python running the benchmark
+    """
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def warm_up(engine):
+    """
+    Compute a first generation, untimed, and its changes
+    """
+    engine.step()
+    len(engine.births), len(engine.deaths)
+
+
+def run_case(engine_name, workload, generations, rule=None):
+    """
+    Run a workload on an engine, to be called in a new process so the peak RSS only counts this case.
+    The generations are timed after a first one, see warm_up(), so end_population is generations + 1 later.
+
+    :return: A dict of the measures
+    """
+    top = time.perf_counter()
+    engine = setup(engine_name, workload, rule)
+    start_population = engine.population
+    latencies = []
+    changes = 0
+    try:
+        warm_up(engine)
+        # Creating the engine and its first step build the rule tables and buffers, timed apart from the steps
+        setup_seconds = time.perf_counter() - top
+        for _ in range(generations):
+            top = time.perf_counter()
+            engine.step()
+            # A view draws the changes, which some engines only compute when asked
+            changes += len(engine.births) + len(engine.deaths)
+            latencies.append(time.perf_counter() - top)
+        end_population = engine.population
+    finally:
+        close(engine)
+
+    # Allocations are traced on a new engine, once the timing is done
+    engine = setup(engine_name, workload, rule)
+    try:
+        warm_up(engine)
+        tracemalloc.start()
+        for _ in range(min(generations, ALLOCATION_GENERATIONS)):
+            engine.step()
+            len(engine.births), len(engine.deaths)
+        allocated, allocated_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        close(engine)
+
+    seconds = sum(latencies)
+    return {
+        "engine": engine_name,
+        "workload": workload,
+        "rule": str(parse(rule)),
+        "generations": generations,
+        "start_population": start_population,
+        "end_population": end_population,
+        "changes": changes,
+        "setup_ms": setup_seconds * 1000,
+        "seconds": seconds,
+        "generations_per_second": generations / seconds if seconds else None,
+        "latency_ms": summary(latencies),
+        "peak_rss_bytes": peak_rss(),
+        "allocated_bytes": allocated,
+        "allocated_peak_bytes": allocated_peak,
+    }
+
+
+def run(engines, cases, generations, log=None, rule=None):
+    """
+    :param engines: names of the engines
+    :param cases: names of the workloads
+    :param generations: number of generations of each case
+    :param log: function called with a line of progress, None for silence
+    :param rule: Life-like rule of the engines, see rules.parse()
+    :return: A list of the measures of each case, with an "error" entry for the cases which failed
+    """
+    results = []
+    for engine_name in engines:
+        for workload in cases:
+            # A new process for each case, so they don't share memory peaks nor caches
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    result = executor.submit(run_case, engine_name, workload, generations, rule).result()
+                except Exception as error:
+                    result = {"engine": engine_name, "workload": workload, "error": f"{type(error).__name__}: {error}"}
+            results.append(result)
+
+            if log is not None:
+                if "error" in result:
+                    log(f"{engine_name:>10} {workload:<16} {result['error']}")
+                else:
+                    # Both are unknown when no generation was computed
+                    speed, p99 = result["generations_per_second"], result["latency_ms"].get("p99")
+                    speed = "n/a" if speed is None else f"{speed:.1f}"
+                    p99 = "n/a" if p99 is None else f"{p99:.3f}"
+                    log(f"{engine_name:>10} {workload:<16} {speed:>12} gen/s  p99 {p99:>9} ms")
+    return results
+
+
+def compare(results, baseline):
+    """
+    :param results: measures of this run
+    :param baseline: measures of a previous run
+    :return: An iterator over (engine, workload, speed of this run / speed of the baseline)
+    """
+    speeds = {
+        (result["engine"], result["workload"]): result["generations_per_second"]
+        for result in baseline if result.get("generations_per_second")
+    }
+    for result in results:
+        previous = speeds.get((result["engine"], result["workload"]))
+        if previous and result.get("generations_per_second"):
+            yield result["engine"], result["workload"], result["generations_per_second"] / previous
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Golpy engines")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--workloads", nargs="+", help=f"default: {' '.join(workloads())}")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SOUP_SIZES, help="sizes of the soups")
+    parser.add_argument("--densities", nargs="+", type=float, default=SOUP_DENSITIES, help="densities of the soups")
+    parser.add_argument("--generations", type=int, default=GENERATIONS)
+    parser.add_argument("--rule", default="conway", help="Life-like rule, like B36/S23 or highlife")
+    parser.add_argument("--output", help="JSON file to write, standard output by default")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare the speeds with")
+    options = parser.parse_args(arguments)
+    if options.generations < 1:
+        parser.error("--generations must be at least 1")
+
+    cases = options.workloads or workloads(options.sizes, options.densities)
+
+    def log(line):
+        print(line, file=sys.stderr)
+
+    report = {
+        "environment": environment(),
+        "results": run(options.engines, cases, options.generations, log, options.rule),
+    }
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)["results"]
+        for engine_name, workload, ratio in compare(report["results"], baseline):
+            log(f"{engine_name:>10} {workload:<16} x{ratio:.2f} vs baseline")
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
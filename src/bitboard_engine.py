@@ -0,0 +1,288 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+
+from bitplanes import count_bits, next_bits, row_sums
+from cellkey import unpack
+from dense_engine import diff, to_arrays, to_keys
+from engine import BulkEdit
+from rules import parse
+
+# Rows are packed in little endian 64 bits words: cell origin_x + 64 * w + b is the bit b of the word w
+WORD = np.dtype("<u8")
+WORD_BITS = 64
+# Number of empty rows and words added around the living area when the array has to grow
+GROW_ROWS = 32
+GROW_WORDS = 1
+# Number of generations between two attempts to shrink the array around the living area
+SHRINK_PERIOD = 64
+
+_ONE = np.uint64(1)
+_TOP = np.uint64(WORD_BITS - 1)
+
+
+def popcount(words):
+    """
+    :param words: array of WORD
+    :return: The number of set bits in the array
+    """
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class BitboardEngine(BulkEdit):
+
+    def __init__(self, cells=(), rule=None):
+        """
+        Game of life simulation storing the living area as rows of cells packed in 64 bits words.
+
+        The eight neighbours are summed with bitwise full adders, so each numpy operation updates 64 cells at once
+        and a cell costs a single bit: the most memory efficient engine for large patterns.
+        The first and last rows and words of the array are always empty, and the array grows or shrinks
+        with the living area. origin_x is always a multiple of 64 so resizing only copies whole words.
+
+        Same API as engine.Engine.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        self.rule = parse(rule)
+        self.grid = np.zeros((2 * GROW_ROWS, 2 * GROW_WORDS), dtype=WORD)
+        self.origin_x = -GROW_WORDS * WORD_BITS
+        self.origin_y = -GROW_ROWS
+        self.generation = 0
+        self._previous = None
+        self._changes = (set(), set())
+
+        self.set_cells(cells)
+
+    @property
+    def population(self):
+        return popcount(self.grid)
+
+    @property
+    def active_cells(self):
+        """
+        :return: A new set with the keys of the living cells
+        """
+        ys, xs = np.nonzero(self.unpack())
+        return set(to_keys(xs + self.origin_x, ys + self.origin_y))
+
+    def cells(self):
+        ys, xs = np.nonzero(self.unpack())
+        return zip((xs + self.origin_x).tolist(), (ys + self.origin_y).tolist())
+
+    def unpack(self):
+        """
+        :return: The array as a uint8 array with one cell per byte
+        """
+        return np.unpackbits(self.grid.view(np.uint8), axis=1, bitorder="little")
+
+    @property
+    def births(self):
+        return self.__changes()[0]
+
+    @property
+    def deaths(self):
+        return self.__changes()[1]
+
+    def __index(self, x, y):
+        """
+        :return: The row, word and bit of the cell, None if it's out of the array
+        """
+        row, col = y - self.origin_y, x - self.origin_x
+        height, width = self.grid.shape
+        if 0 <= row < height and 0 <= col < width * WORD_BITS:
+            return row, col // WORD_BITS, col % WORD_BITS
+        return None
+
+    def __get(self, x, y):
+        index = self.__index(x, y)
+        if index is None:
+            return 0
+        row, word, bit = index
+        return (int(self.grid[row, word]) >> bit) & 1
+
+    def is_alive(self, key):
+        return bool(self.__get(*unpack(key)))
+
+    def count_around(self, key):
+        x, y = unpack(key)
+        return sum(self.__get(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+
+    def change_state(self, key):
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        x, y = unpack(key)
+        self.__fit(x, y, x, y)
+        row, word, bit = self.__index(x, y)
+        self.grid[row, word] |= np.uint64(1 << bit)
+
+    def remove(self, key):
+        index = self.__index(*unpack(key))
+        if index is not None:
+            row, word, bit = index
+            self.grid[row, word] &= ~np.uint64(1 << bit)
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, with a single array write
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        xs, ys = to_arrays(cells)
+        if alive and len(xs):
+            self.__fit(int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+        elif not alive:
+            height, width = self.grid.shape
+            inside = ((xs >= self.origin_x) & (xs < self.origin_x + width * WORD_BITS) &
+                      (ys >= self.origin_y) & (ys < self.origin_y + height))
+            xs, ys = xs[inside], ys[inside]
+
+        rows, cols = ys - self.origin_y, xs - self.origin_x
+        words = cols // WORD_BITS
+        bits = _ONE << (cols % WORD_BITS).astype(np.uint64)
+        changed = ((self.grid[rows, words] & bits) != 0) != alive
+        if alive:
+            np.bitwise_or.at(self.grid, (rows, words), bits)
+        else:
+            np.bitwise_and.at(self.grid, (rows, words), ~bits)
+        keys = set(to_keys(xs[changed], ys[changed]))
+        return (keys, set()) if alive else (set(), keys)
+
+    def clear(self):
+        dead = self.active_cells
+        self.grid = np.zeros((2 * GROW_ROWS, 2 * GROW_WORDS), dtype=WORD)
+        self.origin_x = -GROW_WORDS * WORD_BITS
+        self.origin_y = -GROW_ROWS
+        return set(), dead
+
+    def step(self, n=1):
+        """
+        Compute the n next generations. births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        self._previous = (self.unpack(), self.origin_x, self.origin_y)
+        self._changes = None
+
+        for _ in range(n):
+            self._update()
+
+    def _update(self):
+        a = self.grid
+
+        # West and east neighbours of every cell, carrying bits across words
+        before, after = np.zeros_like(a), np.zeros_like(a)
+        before[:, 1:] = a[:, :-1]
+        after[:, :-1] = a[:, 1:]
+        west = (a << _ONE) | (before >> _TOP)
+        east = (a >> _ONE) | (after << _TOP)
+
+        # 2 bits sums of the three cells of each row, and of the two side cells only
+        row0, row1, side0, side1 = row_sums(west, a, east)
+
+        # Rows above and below
+        top0, top1, bottom0, bottom1 = (np.zeros_like(a) for _ in range(4))
+        top0[1:], top1[1:] = row0[:-1], row1[:-1]
+        bottom0[:-1], bottom1[:-1] = row0[1:], row1[1:]
+
+        bits = count_bits((top0, top1), (side0, side1), (bottom0, bottom1))
+        new = next_bits(self.rule, bits, a, lambda: np.zeros_like(a))
+        self.grid = new
+        self.generation += 1
+
+        # Keep the border of the array empty, then sometimes shrink it to the living area
+        g = self.grid
+        if g[0].any() or g[-1].any() or g[:, 0].any() or g[:, -1].any():
+            self.__resize(*self.bounding_box())
+        elif self.generation % SHRINK_PERIOD == 0:
+            self.__shrink()
+
+    def bounding_box(self):
+        """
+        :return: (min_x, min_y, max_x, max_y) of the living cells, None if there is none
+        """
+        rows = np.flatnonzero(self.grid.any(axis=1))
+        if not len(rows):
+            return None
+        words = np.flatnonzero(self.grid.any(axis=0))
+        first = int(np.bitwise_or.reduce(self.grid[:, words[0]]))
+        last = int(np.bitwise_or.reduce(self.grid[:, words[-1]]))
+        return (
+            self.origin_x + int(words[0]) * WORD_BITS + (first & -first).bit_length() - 1,
+            self.origin_y + int(rows[0]),
+            self.origin_x + int(words[-1]) * WORD_BITS + last.bit_length() - 1,
+            self.origin_y + int(rows[-1])
+        )
+
+    def __fit(self, min_x, min_y, max_x, max_y):
+        """
+        Grow the array so the given box and an empty border fit in
+        """
+        height, width = self.grid.shape
+        if (min_x >= self.origin_x + WORD_BITS and min_y > self.origin_y and
+                max_x < self.origin_x + (width - 1) * WORD_BITS and max_y < self.origin_y + height - 1):
+            return
+
+        box = self.bounding_box()
+        if box is not None:
+            min_x, min_y = min(min_x, box[0]), min(min_y, box[1])
+            max_x, max_y = max(max_x, box[2]), max(max_y, box[3])
+        self.__resize(min_x, min_y, max_x, max_y)
+
+    def __shrink(self):
+        box = self.bounding_box()
+        if box is None:
+            box = (0, 0, 0, 0)
+        words = (box[2] - box[0]) // WORD_BITS + 1 + 2 * GROW_WORDS
+        rows = box[3] - box[1] + 1 + 2 * GROW_ROWS
+        if self.grid.size > 4 * words * rows:
+            self.__resize(*box)
+
+    def __resize(self, min_x, min_y, max_x, max_y):
+        """
+        Copy the array in a new one fitting the box with GROW_ROWS empty rows and GROW_WORDS empty words around it
+        """
+        first_word = min_x // WORD_BITS - GROW_WORDS
+        last_word = max_x // WORD_BITS + GROW_WORDS
+        first_row, last_row = min_y - GROW_ROWS, max_y + GROW_ROWS
+        grid = np.zeros((last_row - first_row + 1, last_word - first_word + 1), dtype=WORD)
+
+        # Copy the part common to both arrays, which holds all the living cells
+        old_word, old_row = self.origin_x // WORD_BITS, self.origin_y
+        height, width = self.grid.shape
+        row0, row1 = max(first_row, old_row), min(last_row, old_row + height - 1)
+        word0, word1 = max(first_word, old_word), min(last_word, old_word + width - 1)
+        if row0 <= row1 and word0 <= word1:
+            grid[row0 - first_row:row1 - first_row + 1, word0 - first_word:word1 - first_word + 1] = \
+                self.grid[row0 - old_row:row1 - old_row + 1, word0 - old_word:word1 - old_word + 1]
+
+        self.grid = grid
+        self.origin_x, self.origin_y = first_word * WORD_BITS, first_row
+
+    def __changes(self):
+        """
+        Diff the array with the one saved at the beginning of the last step() call, once
+        """
+        if self._changes is None:
+            previous, origin_x, origin_y = self._previous
+            self._changes = diff(previous, origin_x, origin_y, self.unpack(), self.origin_x, self.origin_y)
+        return self._changes
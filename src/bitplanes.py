@@ -0,0 +1,84 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+# Bit-parallel neighbour counting shared by the engines packing a cell per bit. The functions only use the bitwise
+# operators, so they work on numpy arrays of words as well as on Python ints holding a whole tile.
+
+
+def majority(a, b, c):
+    """ Carry of a full adder """
+    return (a & b) | (c & (a ^ b))
+
+
+def row_sums(west, center, east):
+    """
+    :param west: bits of the west neighbour of each cell
+    :param center: bits of the cells
+    :param east: bits of the east neighbour of each cell
+    :return: The 2 bits sums (low, high) of the three cells of each row, then of the two side cells only
+    """
+    return west ^ center ^ east, majority(west, center, east), west ^ east, west & east
+
+
+def count_bits(top, side, bottom):
+    """
+    :param top: 2 bits sums (low, high) of the three cells above each cell
+    :param side: 2 bits sums of its west and east neighbours
+    :param bottom: 2 bits sums of the three cells below it
+    :return: The four bits of the numbers of neighbours, lowest first
+    """
+    sum0 = top[0] ^ side[0] ^ bottom[0]
+    carry0 = majority(top[0], side[0], bottom[0])
+    twos = top[1] ^ side[1] ^ bottom[1]
+    sum1 = twos ^ carry0
+    fours, carry1 = majority(top[1], side[1], bottom[1]), twos & carry0
+    return sum0, sum1, fours ^ carry1, fours & carry1
+
+
+def equals(bits, count):
+    """
+    :param bits: the four bits of the numbers of neighbours, lowest first
+    :param count: number of neighbours, between 0 and 8
+    :return: The bits of the cells having count neighbours
+    """
+    if count == 8:
+        return bits[3]
+
+    # With 8 neighbours the three low bits are 0, so only 0 has to check the fourth one
+    result = ~bits[3] if count == 0 else None
+    for bit in range(3):
+        term = bits[bit] if count >> bit & 1 else ~bits[bit]
+        result = term if result is None else result & term
+    return result
+
+
+def next_bits(rule, bits, alive, empty):
+    """
+    Apply a rule with one comparison per number of neighbours in it
+
+    :param rule: rules.Rule
+    :param bits: the four bits of the numbers of neighbours, lowest first
+    :param alive: bits of the living cells
+    :param empty: function returning new bits with no cell, like int
+    :return: The bits of the cells alive in the next generation. With ints, bits beyond the cells may be set.
+    """
+    new = empty()
+    for first, last in rule.both:
+        for count in range(first, last + 1):
+            new |= equals(bits, count)
+    for ranges, state in ((rule.survive_only, alive), (rule.born_only, ~alive)):
+        if ranges:
+            matches = empty()
+            for first, last in ranges:
+                for count in range(first, last + 1):
+                    matches |= equals(bits, count)
+            new |= matches & state
+    return new
@@ -1,173 +1,428 @@
-from vector2 import Vector2
 import time
 
+import cycles
+from vector2 import Vector2
+from engine import Engine
+from cellkey import from_vector, unpack
+from simulation import SimulationThread
+from spatial_index import SpatialIndex
 
-class Mask:
-
-    def __init__(self):
-        self.mask = dict()
-
-    def add(self, key):
-        if key in self.mask.keys():
-            self.mask[key] += 1
-        else:
-            self.mask[key] = 1
-
-    def remove(self, key):
-        self.mask[key] -= 1
-        if self.mask[key] == 0:
-            del self.mask[key]
-
-    def copy(self):
-        mask = Mask()
-        mask.mask = self.mask.copy()
-        return mask
-
-    def __setitem__(self, key, value):
-        self.mask[key] = value
-
-    def __getitem__(self, item):
-        return self.mask[item]
-
-    def __str__(self):
-        return str(self.mask)
-
-    def __contains__(self, item):
-        return item in self.mask.keys()
-
-    def __iter__(self):
-        return iter(self.mask)
-
-    def __next__(self):
-        return next(self.mask)
+# Maximum number of hidden canvas items kept for reuse
+POOL_SIZE = 1024
 
 
 class CellGrid:
 
     def __init__(self, canvas=None, cell_size=None, color=None, **kwargs):
+        """
+        View of an Engine on a CentralWidget: only draws the cells the engine reports as changed.
+
+        Only the cells inside the canvas view have an item. The living cells are kept in a spatial index so the
+        visible ones are found without looking at the others when the view changes, and the items of the cells
+        leaving the view or dying are hidden and reused for the next ones to draw.
+        When zoomed out so much that cells are smaller than raster_cell_size px, the visible cells are drawn in a
+        single image instead (see raster.py).
+
+        :param canvas: CentralWidget to draw on
+        :param cell_size: size of a cell in px
+        :param color: color of the living cells
+        :param kwargs:
+            -engine: simulation engine, a new Engine by default
+            -acceleration_factor
+            -frame_rate: number of redraws per second while simulating
+            -queue_size: maximum number of frames waiting to be drawn
+            -raster_cell_size: size of a cell in px under which cells are drawn in an image
+            -history: checkpoint.History recording the simulated generations, to go back to them with seek()
+            -pause_on_cycle: True to stop the simulation when the board comes back to a recent state, possibly moved
+            -on_cycle: function called with the cycles.Cycle found when the simulation stops on a cycle
+            -profiler: profiler.Profiler recording the simulation and the rendering
+            -census: analysis.Census of the objects of the board, kept up to date with the edits and the simulation
+            -stats: stats.Stats of the board, kept up to date with the edits and the simulation
+        """
         if canvas is None or cell_size is None or color is None:
             self.exists = False
             return
 
         self.exists = True
-        self.active_cells = {}
-        self.mask = set()
-        self.mask_count = Mask()
+        self.engine = kwargs.pop("engine", None) or Engine()
+        self.items = {}
+        self.pool = []
+        self.index = self.__new_index()
         self.simulating = False
-        # Speed in Hz
+        self.simulation = None
+        # Speed in Hz, independent of the frame rate since the simulation runs in its own thread
         self.speed = 10
         self.acceleration_factor = kwargs.pop("acceleration_factor", 1.3)
+        self.frame_rate = kwargs.pop("frame_rate", 60)
+        self.queue_size = kwargs.pop("queue_size", 4)
+        self.raster_cell_size = kwargs.pop("raster_cell_size", 4)
+        self.history = kwargs.pop("history", None)
+        self.pause_on_cycle = kwargs.pop("pause_on_cycle", False)
+        self.on_cycle = kwargs.pop("on_cycle", None)
+        self.profiler = kwargs.pop("profiler", None)
+        self.census = kwargs.pop("census", None)
+        self.stats = kwargs.pop("stats", None)
+        self.__reset_analysis()
+        # perf_counter() time at which loop() is expected to be called
+        self.next_loop = None
+        # Cycle of the board found while simulating, until the cells are edited
+        self.cycle = None
+        self.rasterizer = None
+        self.raster_item = None
+        self.photo = None
 
         self.canvas = canvas
         self.canvas.set_cell_grid(self)
         self.cell_size = cell_size
         self.color = color
 
+        self.refresh_view()
+
+    @property
+    def active_cells(self):
+        return self.engine.active_cells
+
     def is_alive(self, pos: Vector2):
-        return pos in self.active_cells.keys()
+        return self.engine.is_alive(from_vector(pos))
 
-    def change_state(self, pos: Vector2):
+    def load(self, cells):
+        """
+        Replace all the living cells at once, then draw the visible ones
+
+        :param cells: iterable of the (x, y) coordinates of the living cells
+        """
         if self.simulating:
             return
 
-        if not(self.is_alive(pos)):
-            self.__add(pos)
-        else:
-            self.__remove(pos)
+        # Read all the cells first, so a pattern failing to parse leaves the board as it was
+        cells = list(cells)
+        self.engine.clear()
+        self.engine.set_cells(cells)
+        self.cycle = None
+        self.__reindex()
+
+    def __reindex(self):
+        """
+        Index all the living cells of the engine again and redraw the visible ones
+        """
+        self.index = self.__new_index()
+        self.__reset_analysis()
+        for key in list(self.items):
+            self.__erase(key)
+        self.refresh_view()
+
+    def __reset_analysis(self):
+        """
+        Count all the living cells of the engine again in the census and the statistics
+        """
+        if self.census is not None:
+            self.census.reset(self.engine.active_cells)
+        if self.stats is not None:
+            self.stats.reset(self.engine.active_cells, self.engine.generation)
+
+    def __update_analysis(self, births, deaths):
+        """
+        Count the changes of an edit in the census and the statistics
+        """
+        if self.census is not None:
+            self.census.update(births, deaths)
+        if self.stats is not None:
+            self.stats.update(births, deaths)
+
+    def bounding_box(self):
+        """
+        :return: (min_x, min_y, max_x, max_y) of the living cells, None if there is none or without stats, since
+                 the engine can't be scanned while the simulation thread changes it
+        """
+        if self.stats is None:
+            return None
+        return self.stats.bounding_box
+
+    def __new_index(self):
+        """
+        :return: The spatial index of the engine when it has one, like the paged engine whose cells may not fit in
+                 memory, else a new SpatialIndex of the living cells
+        """
+        if hasattr(self.engine, "view_index"):
+            return self.engine.view_index
+        return SpatialIndex(self.engine.active_cells)
+
+    def fast_forward(self, generations):
+        """
+        Skip generations of a board in the cycle found while simulating, computing at most one period
+
+        :param generations: number of generations to skip
+        """
+        if self.simulating or self.cycle is None:
+            return
+
+        cycles.fast_forward(self.engine, self.cycle, generations)
+        self.__reindex()
+
+    def seek(self, generation):
+        """
+        Go back (or forward) to a generation recorded in the history
+
+        :param generation: wanted generation, the last recorded one before it is loaded if it wasn't recorded
+        """
+        if self.simulating or self.history is None:
+            return
+
+        generation, keys = self.history.seek(generation)
+        self.engine.generation = generation
+        self.load(map(unpack, keys))
+
+    def clear(self):
+        """
+        Kill all the cells
+        """
+        self.load(())
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, see Engine.set_cells()
+        """
+        self.__edit(self.engine.set_cells, cells, alive)
+
+    def paste(self, pattern, offset=(0, 0)):
+        """
+        Bring the cells of a pattern to life, see Engine.paste()
+        """
+        self.__edit(self.engine.paste, pattern, offset)
+
+    def fill_rect(self, min_x, min_y, max_x, max_y, alive=True):
+        """
+        Bring to life or kill all the cells of a rectangle, see Engine.fill_rect()
+        """
+        self.__edit(self.engine.fill_rect, min_x, min_y, max_x, max_y, alive)
+
+    def random_fill(self, min_x, min_y, max_x, max_y, density=0.5, seed=None):
+        """
+        Bring to life random cells of a rectangle, see Engine.random_fill()
+        """
+        self.__edit(self.engine.random_fill, min_x, min_y, max_x, max_y, density, seed)
+
+    def __edit(self, edit, *args):
+        """
+        Apply an edit of the engine, then draw all its changes at once
+        """
+        if self.simulating:
+            return
+
+        births, deaths = edit(*args)
+        self.cycle = None
+        self.__update_analysis(births, deaths)
+        self.__apply(births, deaths)
+
+    def change_state(self, pos: Vector2):
+        if self.simulating:
+            return
 
-    def __add(self, pos: Vector2):
+        key = from_vector(pos)
+        self.cycle = None
+        births, deaths = ((key,), ()) if self.engine.change_state(key) else ((), (key,))
+        self.__update_analysis(births, deaths)
+        self.__apply(births, deaths)
+
+    @property
+    def rastering(self):
+        """
+        :return: True if the cells are drawn in an image at the current zoom
+        """
+        view_width = self.canvas.view.scale.x
+        return view_width > 0 and self.cell_size * self.canvas.winfo_width() / view_width < self.raster_cell_size
+
+    def __visible_box(self):
+        """
+        :return: (min_x, min_y, max_x, max_y) of the cells in the canvas view
+        """
+        rect = self.canvas.view.rect
+        return tuple(int(v // self.cell_size) for v in rect)
+
+    def __coords(self, key):
+        """
+        :return: The Canvas coordinates of the top left and bottom right corners of the cell
+        """
+        x, y = unpack(key)
         top_left = self.canvas.to_draw(Vector2(
-            pos.x * self.cell_size,
-            pos.y * self.cell_size
+            x * self.cell_size,
+            y * self.cell_size
         )).tuple()
         bottom_right = self.canvas.to_draw(Vector2(
-            (pos.x + 1) * self.cell_size,
-            (pos.y + 1) * self.cell_size
+            (x + 1) * self.cell_size,
+            (y + 1) * self.cell_size
         )).tuple()
+        return *top_left, *bottom_right
 
-        self.active_cells[pos] = self.canvas.create_rectangle(
-            *top_left, *bottom_right,
-            fill=self.color, width=0
-        )
-
-        self.canvas.tag_raise("grid")
+    def __draw(self, key):
+        if self.pool:
+            item = self.pool.pop()
+            self.canvas.coords(item, *self.__coords(key))
+            self.canvas.itemconfigure(item, state="normal")
+        else:
+            item = self.canvas.create_rectangle(
+                *self.__coords(key),
+                fill=self.color, width=0
+            )
+        self.items[key] = item
+
+    def __erase(self, key):
+        item = self.items.pop(key)
+        if len(self.pool) < POOL_SIZE:
+            self.canvas.itemconfigure(item, state="hidden")
+            self.pool.append(item)
+        else:
+            self.canvas.delete(item)
+
+    def __apply(self, births, deaths):
+        """
+        Update the index with a batch of changes and draw the visible ones
+        """
+        if self.raster_item is not None:
+            for key in deaths:
+                self.index.remove(key)
+            for key in births:
+                self.index.add(key)
+            if births or deaths:
+                self.__draw_raster()
+            return
 
-        for vec in self.__around():
-            around = pos + vec
-            if not self.is_alive(around):
-                self.mask.add(around)
-                self.mask_count.add(around)
+        min_x, min_y, max_x, max_y = self.__visible_box()
+
+        for key in deaths:
+            self.index.remove(key)
+            if key in self.items:
+                self.__erase(key)
+
+        drawn = False
+        for key in births:
+            self.index.add(key)
+            x, y = unpack(key)
+            # The engine's index may be ahead of the frames, so the cell may already be drawn
+            if min_x <= x <= max_x and min_y <= y <= max_y and key not in self.items:
+                self.__draw(key)
+                drawn = True
+
+        if drawn:
+            self.canvas.tag_raise("grid")
+            self.canvas.tag_raise("hud")
+
+    def refresh_view(self):
+        """
+        Draw the living cells entering the view, move the ones staying in it and release the items of the cells
+        leaving it, or redraw the image when zoomed out. To be called when the view changes.
+        """
+        if not self.canvas.view.scale.x:
+            return
 
-        if pos in self.mask:
-            self.mask.remove(pos)
-            self.mask_count.remove(pos)
+        if self.rastering:
+            for key in list(self.items):
+                self.__erase(key)
+            self.__draw_raster()
+            return
 
-    def __remove(self, pos: Vector2):
-        cell = self.active_cells.pop(pos)
-        self.canvas.delete(cell)
+        if self.raster_item is not None:
+            self.canvas.delete(self.raster_item)
+            self.raster_item = self.photo = None
+
+        visible = set(self.index.query(*self.__visible_box()))
+
+        for key in [key for key in self.items if key not in visible]:
+            self.__erase(key)
+
+        drawn = False
+        for key in visible:
+            if key in self.items:
+                self.canvas.coords(self.items[key], *self.__coords(key))
+            else:
+                self.__draw(key)
+                drawn = True
+
+        if drawn:
+            self.canvas.tag_raise("grid")
+            self.canvas.tag_raise("hud")
+
+    def __draw_raster(self):
+        """
+        Draw the visible cells in a single image covering the canvas
+        """
+        # Imported here so numpy and PIL are only needed once zoomed out
+        from raster import Rasterizer
+        from PIL import ImageTk
+
+        if self.rasterizer is None:
+            self.rasterizer = Rasterizer(self.color, self.canvas.background)
+
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        view = self.canvas.view
+        image = self.rasterizer.render(
+            self.index.query(*self.__visible_box()),
+            view.position, view.scale, self.cell_size, width, height
+        )
 
-        for vec in self.__around():
-            around = pos + vec
-            if around in self.mask:
-                if self.mask_count[around] == 1:
-                    self.mask.remove(around)
-                self.mask_count.remove(around)
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == (width, height):
+            self.photo.paste(image)
+        else:
+            self.photo = ImageTk.PhotoImage(image)
+            if self.raster_item is None:
+                self.raster_item = self.canvas.create_image(0, 0, anchor="nw", image=self.photo, tags="raster")
+            else:
+                self.canvas.itemconfigure(self.raster_item, image=self.photo)
 
-            if self.is_alive(around):
-                self.mask.add(pos)
-                self.mask_count.add(pos)
+        # Panning and zooming move the image with the other items
+        self.canvas.coords(self.raster_item, 0, 0)
+        self.canvas.tag_lower(self.raster_item)
 
     def start_stop(self):
         self.simulating = not self.simulating
         if self.simulating:
+            if self.history is not None:
+                # The cells may have been edited since the last recorded generation
+                self.history.record(self.engine, keyframe=True)
+            # A board known to be in a cycle is simulated anyway when started again
+            detect_cycles = self.pause_on_cycle and self.cycle is None
+            self.simulation = SimulationThread(self.engine, lambda: self.speed, self.queue_size, self.history,
+                                               detect_cycles, self.profiler, self.census, self.stats)
+            self.simulation.start()
+            self.next_loop = None
             self.loop()
+        else:
+            self.simulation.stop()
+            self.__render()
 
     def loop(self):
-        refresh = 1000 / self.speed
-
         if self.simulating:
-            top = time.time_ns() // 1000000
-            self.__update()
-            self.canvas.after(int(refresh - time.time_ns() // 1000000 + top), self.loop)
-
-    def __update(self):
-        tmp_active, tmp_mask = self.active_cells.copy(), self.mask.copy()
-
-        for dead_cell in tmp_mask:
-            if self.count_around(dead_cell, tmp_active) == 3:
-                self.__add(dead_cell)
+            if self.profiler is not None and self.next_loop is not None:
+                self.profiler.record("loop", max(0.0, time.perf_counter() - self.next_loop))
+            self.__render()
+            if self.simulation.cycle is not None and not self.simulation.is_alive():
+                self.cycle = self.simulation.cycle
+                self.start_stop()
+                if self.on_cycle is not None:
+                    self.on_cycle(self.cycle)
+                return
+            delay = int(1000 / self.frame_rate)
+            self.next_loop = time.perf_counter() + delay / 1000
+            self.canvas.after(delay, self.loop)
+
+    def __render(self):
+        """
+        Draw the changes since the last frame, skipping the intermediate generations
+        """
+        births, deaths = self.simulation.changes()
+        if self.profiler is None:
+            self.__apply(births, deaths)
+            return
 
-        for active_cell in tmp_active.keys():
-            count = self.count_around(active_cell, tmp_active)
-            if count < 2 or count > 3:
-                self.__remove(active_cell)
+        with self.profiler.measure("render", births=len(births), deaths=len(deaths)) as values:
+            self.__apply(births, deaths)
+            values["items"] = len(self.items)
 
     def speed_up(self):
-        if self.speed / self.acceleration_factor < 60:
-            self.speed *= self.acceleration_factor
+        self.speed *= self.acceleration_factor
 
     def speed_down(self):
         self.speed /= self.acceleration_factor
 
-    @staticmethod
-    def __around():
-        return (
-            Vector2(-1, -1),
-            Vector2(0, -1),
-            Vector2(1, -1),
-            Vector2(-1, 0),
-            Vector2(1, 0),
-            Vector2(-1, 1),
-            Vector2(0, 1),
-            Vector2(1, 1)
-        )
-
-    def count_around(self, pos: Vector2, active_list):
-        around = self.__around()
-        count = 0
-        for vec in around:
-            vec2 = pos + vec
-            if vec2 in active_list.keys():
-                count += 1
-
-        return count
+    def count_around(self, pos: Vector2):
+        return self.engine.count_around(from_vector(pos))
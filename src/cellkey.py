@@ -0,0 +1,71 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+# Cells are stored as a single int packing both coordinates, which hashes and compares much faster than a Vector2.
+# A neighbour's key is obtained by adding one of the AROUND offsets to the key of the cell, with no intermediate
+# point object.
+
+SHIFT = 32
+BIAS = 1 << (SHIFT - 1)
+LOW = (1 << SHIFT) - 1
+
+
+def pack(x, y):
+    """
+    :param x: column of the cell, between -2**31 and 2**31 - 1
+    :param y: row of the cell, between -2**31 and 2**31 - 1
+    :return: The int key of the cell
+    """
+    return ((y + BIAS) << SHIFT) | (x + BIAS)
+
+
+def unpack(key):
+    """
+    :param key: int key of a cell
+    :return: The (x, y) coordinates of the cell
+    """
+    return (key & LOW) - BIAS, (key >> SHIFT) - BIAS
+
+
+def from_vector(pos):
+    """
+    :param pos: Vector2 position of the cell, coordinates may be floats
+    :return: The int key of the cell
+    """
+    return pack(int(pos.x), int(pos.y))
+
+
+def tile_of(key, shift):
+    """
+    :param key: int key of a cell
+    :param shift: tiles are squares of 2 ** shift cells side
+    :return: The key of the tile holding the cell, packed like a cell key with tile coordinates
+    """
+    return ((key >> SHIFT) >> shift) << SHIFT | ((key & LOW) >> shift)
+
+
+def offset(dx, dy):
+    """
+    :return: The value to add to a key to move it by (dx, dy)
+    """
+    return (dy << SHIFT) + dx
+
+
+# Key offsets of the eight neighbours of a cell
+AROUND = (
+    offset(-1, -1),
+    offset(0, -1),
+    offset(1, -1),
+    offset(-1, 0),
+    offset(1, 0),
+    offset(-1, 1),
+    offset(0, 1),
+    offset(1, 1)
+)
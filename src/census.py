@@ -0,0 +1,205 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from engine import create_engine
+from rules import parse
+from shapes import MAX_PERIOD, OBJECT_DISTANCE, classify, objects
+
+# Headless soup search: random soups are run until they settle, then split into objects which are identified and
+# counted, like apgsearch. Each soup result is a JSON line appended to the output file as soon as it is known, so an
+# interrupted search resumes where it stopped, skipping the seeds already in the file.
+#   python census.py --seeds 0 100000 --output census.jsonl --workers 8
+#   python census.py --output census.jsonl --summary
+
+SIZE = 16
+DENSITY = 0.5
+# The sparse engine is the fastest on small soups
+ENGINE = "sparse"
+# A soup is settled when its population is periodic, with a period up to MAX_PERIOD, over this many generations
+SETTLED_WINDOW = 2 * MAX_PERIOD + 2
+# Number of generations between two checks of a soup
+CHECK_INTERVAL = 32
+MAX_GENERATIONS = 20000
+# Number of soups computed by a worker between two results writes
+CHUNK = 32
+UNSETTLED = "unsettled"
+
+
+def settled(populations, max_period=MAX_PERIOD, window=SETTLED_WINDOW):
+    """
+    :param populations: population of each generation
+    :return: True if the last window populations are periodic with a period up to max_period
+    """
+    if len(populations) < window + max_period:
+        return False
+    recent = populations[-window - max_period:]
+    for period in range(1, max_period + 1):
+        if all(recent[i] == recent[i - period] for i in range(len(recent) - window, len(recent))):
+            return True
+    return False
+
+
+def run_soup(seed, size=SIZE, density=DENSITY, engine=ENGINE, rule=None, max_generations=MAX_GENERATIONS):
+    """
+    Run a random soup until it settles and count its objects
+
+    :param seed: seed of the soup, see BulkEdit.random_fill()
+    :param size: side of the square soup
+    :param density: probability of each cell of the soup to be alive
+    :param engine: name of the engine, see engine.ENGINES
+    :return: A dict of the seed, the number of generations and the number of each object by name. A soup which
+             doesn't settle within max_generations only counts as UNSETTLED.
+    """
+    simulation = create_engine(engine, rule=rule)
+    simulation.random_fill(0, 0, size - 1, size - 1, density, seed)
+    populations = []
+    while simulation.generation < max_generations:
+        simulation.step(CHECK_INTERVAL)
+        populations.append(simulation.population)
+        # The populations of the generations between two checks are needed to find the period
+        for _ in range(SETTLED_WINDOW + MAX_PERIOD):
+            simulation.step()
+            populations.append(simulation.population)
+        if settled(populations):
+            break
+        populations.clear()
+    else:
+        close(simulation)
+        return {"seed": seed, "generations": simulation.generation, "objects": {UNSETTLED: 1}}
+
+    census = Counter(classify(group, rule) for group in objects(set(simulation.cells())))
+    close(simulation)
+    return {"seed": seed, "generations": simulation.generation, "objects": dict(census)}
+
+
+def close(engine):
+    if hasattr(engine, "close"):
+        engine.close()
+
+
+def run_chunk(seeds, options):
+    return [run_soup(seed, **options) for seed in seeds]
+
+
+def done_seeds(path):
+    """
+    Read the seeds of an output file, dropping a last line left incomplete by an interrupted run
+
+    :return: A set of the seeds already searched
+    """
+    if not os.path.exists(path):
+        return set()
+
+    seeds = set()
+    with open(path, "rb+") as file:
+        complete = 0
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            seeds.add(json.loads(line)["seed"])
+            complete += len(line)
+        file.truncate(complete)
+    return seeds
+
+
+def search(first, last, path, workers=None, log=None, **options):
+    """
+    Run the soups of the seeds [first, last[ over a process pool, appending their results to a file.
+    The seeds already in the file are skipped.
+
+    :param path: path of the JSON lines output file
+    :param workers: number of processes, os.cpu_count() by default
+    :param log: function called with a line of progress, None for silence
+    :param options: options of run_soup()
+    :return: The number of soups run
+    """
+    workers = workers or os.cpu_count() or 1
+    done = done_seeds(path)
+    seeds = [seed for seed in range(first, last) if seed not in done]
+    chunks = [seeds[i:i + CHUNK] for i in range(0, len(seeds), CHUNK)]
+
+    top = time.perf_counter()
+    count = 0
+    with open(path, "a") as file, ProcessPoolExecutor(workers) as executor:
+        # Only a few chunks are queued ahead, so the memory doesn't depend on the number of seeds
+        pending = set()
+        chunks = iter(chunks)
+        while True:
+            for chunk in chunks:
+                pending.add(executor.submit(run_chunk, chunk, options))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for result in future.result():
+                    file.write(json.dumps(result) + "\n")
+                count += len(future.result())
+            file.flush()
+
+            if log is not None:
+                elapsed = time.perf_counter() - top
+                log(f"{count}/{len(seeds)} soups, {count * 3600 / elapsed / workers:.0f} soups/hour/core")
+    return count
+
+
+def tally(path):
+    """
+    :param path: path of a JSON lines output file of search()
+    :return: The number of soups and a Counter of the objects found
+    """
+    soups, census = 0, Counter()
+    with open(path) as file:
+        for line in file:
+            soups += 1
+            census.update(json.loads(line)["objects"])
+    return soups, census
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Search random soups and count the objects they settle into")
+    parser.add_argument("--output", required=True, help="JSON lines file of the results, appended to")
+    parser.add_argument("--seeds", nargs=2, type=int, metavar=("FIRST", "LAST"), help="seeds range, LAST excluded")
+    parser.add_argument("--workers", type=int, help="number of processes, one per core by default")
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--density", type=float, default=DENSITY)
+    parser.add_argument("--engine", default=ENGINE)
+    parser.add_argument("--rule", default="conway")
+    parser.add_argument("--max-generations", type=int, default=MAX_GENERATIONS)
+    parser.add_argument("--summary", action="store_true", help="print the census of the output file")
+    options = parser.parse_args(arguments)
+
+    def log(line):
+        print(line, file=sys.stderr)
+
+    if options.seeds:
+        parse(options.rule)
+        search(*options.seeds, options.output, options.workers, log, size=options.size, density=options.density,
+               engine=options.engine, rule=options.rule, max_generations=options.max_generations)
+
+    if options.summary or not options.seeds:
+        soups, census = tally(options.output)
+        print(f"{soups} soups")
+        for name, count in census.most_common():
+            print(f"{count:>10} {name}")
+
+
+if __name__ == '__main__':
+    main()
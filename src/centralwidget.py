@@ -11,6 +11,13 @@ THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR I
 from customcanvas import *
 from cell_grid import CellGrid
 
+# Time in ms between two updates of the performance overlay
+HUD_PERIOD = 250
+# Number of kinds of objects of the census shown in the performance overlay
+HUD_OBJECTS = 4
+# Empty space left around the living cells by zoom_to_fit(), as a part of the view
+FIT_MARGIN = 0.1
+
 
 class CentralWidget(CustomCanvas):
 
@@ -28,6 +35,8 @@ class CentralWidget(CustomCanvas):
             -can_zoom
             -max_zoom
             -min_zoom
+            -grid_min_zoom: zoom under which the grid is hidden
+            -hud_color: color of the performance overlay text, see toggle_hud()
             -CustomCanvas kwargs
         """
         self.parent = parent
@@ -38,7 +47,10 @@ class CentralWidget(CustomCanvas):
         self.can_zoom = kwargs.pop("can_zoom", True)
         self.max_zoom = kwargs.pop("max_zoom", 10)
         self.min_zoom = kwargs.pop("min_zoom", 0.1)
+        self.grid_min_zoom = kwargs.pop("grid_min_zoom", 0.2)
         self.background = kwargs.pop("background", kwargs.pop("bg", "white"))
+        self.hud_color = kwargs.pop("hud_color", self.grid_color)
+        self.hud_visible = False
 
         self.cell_grid: CellGrid = CellGrid()
         self.zooming_scale = 1
@@ -47,18 +59,26 @@ class CentralWidget(CustomCanvas):
 
     def draw_grid(self):
         """
-        Draw the grid for the game of life
+        Draw the lines of the grid inside the view only
         """
         self.delete("grid")
+        if self.zooming_scale < self.grid_min_zoom:
+            return
+
+        left, top, right, bottom = self.view.rect
+        left, top = max(left, -self.maxsize.x), max(top, -self.maxsize.y)
+        right, bottom = min(right, self.maxsize.x), min(bottom, self.maxsize.y)
+        width, height = self.winfo_width(), self.winfo_height()
+
         # Draw vertical lines
-        for x in range(0, self.maxsize.x, self.cell_size):
-            self.create_line(x, -self.maxsize.y, x, self.maxsize.y, fill=self.grid_color, width=0, tags="grid")
-            self.create_line(-x, -self.maxsize.y, -x, self.maxsize.y, fill=self.grid_color, width=0, tags="grid")
+        for x in range(int(left // self.cell_size) * self.cell_size, int(right) + 1, self.cell_size):
+            x = self.to_draw(Vector2(x, 0)).x
+            self.create_line(x, 0, x, height, fill=self.grid_color, width=0, tags="grid")
 
         # Draw horizontal lines
-        for y in range(0, self.maxsize.y, self.cell_size):
-            self.create_line(-self.maxsize.x, y, self.maxsize.x, y, fill=self.grid_color, width=0, tags="grid")
-            self.create_line(-self.maxsize.x, -y, self.maxsize.x, -y, fill=self.grid_color, width=0, tags="grid")
+        for y in range(int(top // self.cell_size) * self.cell_size, int(bottom) + 1, self.cell_size):
+            y = self.to_draw(Vector2(0, y)).y
+            self.create_line(0, y, width, y, fill=self.grid_color, width=0, tags="grid")
 
     def pan(self, event):
         """
@@ -113,12 +133,6 @@ class CentralWidget(CustomCanvas):
                 self.zooming_scale * f < self.min_zoom
         )):
             super(CentralWidget, self).zoom(event)
-            if f < 1 and self.zooming_scale > 0.2 and self.zooming_scale * f < 0.2:
-                self.itemconfigure("grid", state="hidden")
-
-            if f > 1 and self.zooming_scale < 0.2 and self.zooming_scale * f > 0.2:
-                self.itemconfigure("grid", state="normal")
-
             self.zooming_scale *= f
 
     def _geometry_update(self):
@@ -126,10 +140,102 @@ class CentralWidget(CustomCanvas):
         Update the geometry (size informations) and redraw the grid when configuring the canvas by resizing the window
         or calling the tkinter pack, grid or place method.
         """
-        super(CentralWidget, self)._geometry_update()
         if self.maxsize is None:
             self.maxsize = Vector2(self.winfo_width(), self.winfo_height())
+        super(CentralWidget, self)._geometry_update()
+
+    def _view_changed(self):
+        """
+        Project the grid and the cells again for the current view, from their scene coordinates, instead of moving
+        and scaling the items, so they don't drift
+        """
         self.draw_grid()
+        if self.cell_grid.exists:
+            self.cell_grid.refresh_view()
+        self.tag_raise("hud")
+
+    def toggle_hud(self, event=None):
+        """
+        Show or hide the performance overlay, drawn from the samples of the profiler
+
+        :param event: tkinter Event, unused
+        """
+        self.hud_visible = not self.hud_visible
+        if self.hud_visible:
+            self.__update_hud()
+        else:
+            self.delete("hud")
+
+    def __update_hud(self):
+        if not self.hud_visible:
+            return
+
+        self.delete("hud")
+        self.create_text(8, 8, anchor="nw", text=self.hud_text(), fill=self.hud_color, font="TkFixedFont",
+                         tags="hud")
+        self.after(HUD_PERIOD, self.__update_hud)
+
+    def hud_text(self):
+        """
+        :return: The text of the performance overlay: actual and target speeds, then the mean durations of the
+                 parts recorded by the profiler over the last second, and the most common objects of the census
+        """
+        if self.profiler is None:
+            return "No profiler"
+
+        def duration(name):
+            mean = self.profiler.mean(name)
+            return "-" if mean is None else f"{mean * 1000:.2f} ms"
+
+        lines = []
+        if self.cell_grid.exists:
+            target = f"{self.cell_grid.speed:.1f}" if self.cell_grid.simulating else "paused"
+            lines.append(f"gen/s   {self.profiler.rate('step'):.1f} / {target}")
+        step = self.profiler.last("step")
+        if step is not None:
+            lines.append(f"cells   {step.values['population']}  +{step.values['births']} -{step.values['deaths']}")
+            lines.append(f"queue   {step.values['queue']}")
+        lines.append(f"step    {duration('step')}  changes {duration('changes')}")
+        lines.append(f"render  {duration('render')}  redraw {duration('redraw')}")
+        lines.append(f"fps     {self.profiler.rate('render'):.1f}  late {duration('loop')}")
+        stats = self.cell_grid.stats if self.cell_grid.exists else None
+        if stats is not None and stats.bounding_box is not None:
+            min_x, min_y, max_x, max_y = stats.bounding_box
+            lines.append(f"box     {max_x - min_x + 1}x{max_y - min_y + 1} at ({min_x}, {min_y})  "
+                         f"+{stats.births} -{stats.deaths}")
+        census = self.cell_grid.census if self.cell_grid.exists else None
+        if census is not None:
+            objects = "  ".join(f"{count} {name}" for name, count in census.snapshot.most_common(HUD_OBJECTS))
+            lines.append(f"objects {objects or '-'}  census {duration('census')}")
+        return "\n".join(lines)
+
+    def zoom_to_fit(self, event=None):
+        """
+        Center the view on the living cells and zoom so they all fit in it, within the zoom limits
+
+        :param event: tkinter Event, unused
+        """
+        box = self.cell_grid.bounding_box() if self.cell_grid.exists else None
+        if box is None or not (self.size.x and self.size.y):
+            return
+
+        min_x, min_y, max_x, max_y = (v * self.cell_size for v in box)
+        width, height = max_x - min_x + self.cell_size, max_y - min_y + self.cell_size
+        zoom = (1 - 2 * FIT_MARGIN) * min(self.size.x / width, self.size.y / height)
+        # Like zoom(), the view stays between the zoom limits and inside maxsize
+        min_zoom = max(self.min_zoom, self.size.x / (2 * self.maxsize.x), self.size.y / (2 * self.maxsize.y))
+        zoom = max(min(zoom, self.max_zoom), min_zoom)
+
+        # The view is the canvas size at zoom 1, like when the canvas is created
+        scale = self.size / zoom
+        center = Vector2(min_x + width / 2, min_y + height / 2)
+        self.view.position = Vector2(
+            min(max(center.x - scale.x / 2, -self.maxsize.x), self.maxsize.x - scale.x),
+            min(max(center.y - scale.y / 2, -self.maxsize.y), self.maxsize.y - scale.y)
+        )
+        self.view.scale = scale
+        self.zooming_scale = zoom
+        self.request_redraw()
 
     def set_cell_grid(self, cell_grid: CellGrid):
         """
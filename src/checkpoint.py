@@ -0,0 +1,306 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from cellkey import unpack
+from rules import parse
+
+# Snapshots hold a generation and the sorted keys of its living cells, as little endian 64 bits ints which can be
+# read in place from a memory mapped file. Histories are append-only logs of generations, each one stored as a
+# keyframe (all the living cells) or as a delta (the births and deaths since the previous record).
+
+SNAPSHOT_MAGIC = b"GOLPYSNP"
+HISTORY_MAGIC = b"GOLPYHIS"
+# Version of each format, version 1 snapshots had no rule
+VERSIONS = {SNAPSHOT_MAGIC: 2, HISTORY_MAGIC: 1}
+# Magic, version, generation, number of keys, rule in B/S notation padded with zeros, the keys staying aligned
+SNAPSHOT_HEADER = struct.Struct("<8sI4xqQ24s")
+# Magic, version
+HISTORY_HEADER = struct.Struct("<8sI4x")
+# Start of both formats, checked before reading the rest of the header
+PREFIX = HISTORY_HEADER
+# Kind, generation, number of keys of the keyframe or of births, number of deaths
+RECORD_HEADER = struct.Struct("<B7xqQQ")
+KEYFRAME, DELTA = 0, 1
+# Default maximum number of generations between two keyframes of a history
+KEYFRAME_PERIOD = 256
+
+KEY_SIZE = 8
+
+
+def _to_bytes(keys):
+    """
+    :param keys: iterable of cell keys
+    :return: The keys as little endian 64 bits ints
+    """
+    keys = array("Q", keys)
+    if sys.byteorder == "big":
+        keys.byteswap()
+    return keys.tobytes()
+
+
+def _from_bytes(data, offset, count):
+    """
+    :param data: bytes-like object
+    :param offset: offset of the first key
+    :param count: number of keys
+    :return: A sequence of the keys, a view on data when possible
+    """
+    view = memoryview(data)[offset:offset + count * KEY_SIZE]
+    if sys.byteorder == "little":
+        return view.cast("Q")
+    keys = array("Q", view)
+    keys.byteswap()
+    return keys
+
+
+def _check(magic, version, expected, path):
+    if magic != expected:
+        raise ValueError(f"{path} is not a Golpy {'snapshot' if expected == SNAPSHOT_MAGIC else 'history'} file")
+    if version != VERSIONS[expected]:
+        raise ValueError(f"{path} has an unsupported version {version}")
+
+
+def save_snapshot(path, engine):
+    """
+    Save the living cells and generation of an engine. The file is written next to path then renamed, so an
+    interrupted save never corrupts the previous snapshot.
+
+    :param path: path of the snapshot file
+    :param engine: engine to save
+    """
+    keys = sorted(engine.active_cells)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, VERSIONS[SNAPSHOT_MAGIC], engine.generation, len(keys),
+                                        str(engine.rule).encode()))
+        file.write(_to_bytes(keys))
+    os.replace(temporary, path)
+
+
+class Snapshot:
+
+    def __init__(self, path):
+        """
+        Snapshot file mapped in memory: the keys are read in place, and only the pages used are loaded.
+
+        :param path: path of the snapshot file
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(self.data) < PREFIX.size:
+                raise ValueError(f"{path} is not a Golpy snapshot file")
+            _check(*PREFIX.unpack_from(self.data), SNAPSHOT_MAGIC, path)
+            if len(self.data) < SNAPSHOT_HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            _, _, self.generation, count, rule = SNAPSHOT_HEADER.unpack_from(self.data)
+            # Rule of the simulation, the engine loading the snapshot must have the same one
+            self.rule = parse(rule.rstrip(b"\0").decode())
+            if len(self.data) < SNAPSHOT_HEADER.size + count * KEY_SIZE:
+                raise ValueError(f"{path} is truncated")
+        except ValueError:
+            self.data.close()
+            raise
+
+        self.keys = _from_bytes(self.data, SNAPSHOT_HEADER.size, count)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        # Keys are sorted
+        index = bisect_left(self.keys, key)
+        return index < len(self.keys) and self.keys[index] == key
+
+    def cells(self):
+        """
+        :return: An iterator over the (x, y) coordinates of the living cells
+        """
+        return map(unpack, self.keys)
+
+    def close(self):
+        if isinstance(self.keys, memoryview):
+            self.keys.release()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_snapshot(path, engine):
+    """
+    Replace the living cells and generation of an engine by the ones of a snapshot
+
+    :param path: path of the snapshot file
+    :param engine: engine to load the snapshot in, with the rule of the snapshot
+    """
+    with Snapshot(path) as snapshot:
+        if snapshot.rule != engine.rule:
+            raise ValueError(f"{path} is a {snapshot.rule} simulation, not {engine.rule}")
+        engine.clear()
+        engine.set_cells(snapshot.cells())
+        engine.generation = snapshot.generation
+
+
+class History:
+
+    def __init__(self, path, keyframe_period=KEYFRAME_PERIOD):
+        """
+        Append-only log of the generations of a simulation, to go back to any of them with seek().
+
+        Each record holds the births and deaths since the previous one, and every keyframe_period generations
+        all the living cells, so seeking only replays the records since the last keyframe.
+        An existing file is reopened and appended to.
+
+        :param path: path of the history file
+        :param keyframe_period: maximum number of generations between two keyframes
+        """
+        self.path = path
+        self.keyframe_period = keyframe_period
+        # Generation and file offset of each record, and indices of the keyframes among them
+        self.generations = []
+        self.offsets = []
+        self.keyframes = []
+
+        self.file = open(path, "a+b")
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() == 0:
+            self.file.write(HISTORY_HEADER.pack(HISTORY_MAGIC, VERSIONS[HISTORY_MAGIC]))
+        else:
+            try:
+                self.__scan()
+            except ValueError:
+                self.file.close()
+                raise
+
+    def __scan(self):
+        """
+        Index the records of an existing file, reading their headers only
+        """
+        file = self.file
+        size = file.tell()
+        file.seek(0)
+        header = file.read(HISTORY_HEADER.size)
+        if len(header) < HISTORY_HEADER.size:
+            raise ValueError(f"{self.path} is not a Golpy history file")
+        _check(*HISTORY_HEADER.unpack(header), HISTORY_MAGIC, self.path)
+
+        offset = HISTORY_HEADER.size
+        while offset + RECORD_HEADER.size <= size:
+            kind, generation, first, second = RECORD_HEADER.unpack(file.read(RECORD_HEADER.size))
+            end = offset + RECORD_HEADER.size + (first + second) * KEY_SIZE
+            if end > size:
+                break
+            self.__index(kind, generation, offset)
+            offset = end
+            file.seek(offset)
+
+        # Drop a record left incomplete by an interrupted write
+        file.truncate(offset)
+
+    def __index(self, kind, generation, offset):
+        if kind == KEYFRAME:
+            self.keyframes.append(len(self.generations))
+        self.generations.append(generation)
+        self.offsets.append(offset)
+
+    def __write(self, kind, generation, first, second=()):
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(RECORD_HEADER.pack(kind, generation, len(first), len(second)))
+        self.file.write(_to_bytes(first))
+        self.file.write(_to_bytes(second))
+        self.__index(kind, generation, offset)
+
+    def record(self, engine, keyframe=False):
+        """
+        Append the current generation of an engine. To be called after each step() of the engine, since a delta
+        holds the changes since the previous record.
+        Recording a generation already in the log drops it and the following ones, so resuming a simulation from
+        a former generation forks its history.
+
+        :param engine: engine which just computed a generation
+        :param keyframe: True to store all the living cells, needed when the cells were edited since the previous
+                         record
+        """
+        generation = engine.generation
+        if self.generations and generation <= self.generations[-1]:
+            self.truncate(generation)
+            keyframe = True
+
+        last_keyframe = self.generations[self.keyframes[-1]] if self.keyframes else None
+        if keyframe or last_keyframe is None or generation - last_keyframe >= self.keyframe_period:
+            self.__write(KEYFRAME, generation, sorted(engine.active_cells))
+        else:
+            self.__write(DELTA, generation, engine.births, engine.deaths)
+
+    def truncate(self, generation):
+        """
+        Drop the records of the generation and the following ones
+        """
+        index = bisect_left(self.generations, generation)
+        if index == len(self.generations):
+            return
+
+        self.file.truncate(self.offsets[index])
+        del self.generations[index:]
+        del self.offsets[index:]
+        self.keyframes = [keyframe for keyframe in self.keyframes if keyframe < index]
+
+    def seek(self, generation):
+        """
+        :param generation: wanted generation
+        :return: The last recorded generation up to the wanted one, and a set with the keys of its living cells
+        """
+        last = bisect_right(self.generations, generation) - 1
+        if last < 0:
+            raise ValueError(f"No generation up to {generation} in {self.path}")
+        first = self.keyframes[bisect_right(self.keyframes, last) - 1]
+
+        self.file.flush()
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            _, _, count, _ = RECORD_HEADER.unpack_from(data, self.offsets[first])
+            keys = _from_bytes(data, self.offsets[first] + RECORD_HEADER.size, count)
+            cells = set(keys)
+            if isinstance(keys, memoryview):
+                keys.release()
+
+            for index in range(first + 1, last + 1):
+                offset = self.offsets[index] + RECORD_HEADER.size
+                _, _, born, dead = RECORD_HEADER.unpack_from(data, self.offsets[index])
+                births = _from_bytes(data, offset, born)
+                deaths = _from_bytes(data, offset + born * KEY_SIZE, dead)
+                cells.update(births)
+                cells.difference_update(deaths)
+                if isinstance(births, memoryview):
+                    births.release()
+                    deaths.release()
+
+        return self.generations[last], cells
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -8,6 +8,7 @@ The above copyright notice and this permission notice shall be included in all c
 THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
+import time
 from tkinter import Canvas
 from vector2 import Vector2
 from rect import Rect
@@ -15,11 +16,15 @@ from rect import Rect
 
 class CustomCanvas(Canvas):
 
-    def __init__(self, parent, zoom_magnitude=1.3, **kwargs):
+    def __init__(self, parent, zoom_magnitude=1.3, frame_rate=60, profiler=None, **kwargs):
         """
             Tkinter Canvas with zoom and pan supported for simple geometry.
         Does not support zoom for images and texts.
 
+        Pans and zooms only update the view. The items are then updated at most frame_rate times per second by
+        _view_changed(), which moves and scales them by the difference with the last drawn view. Subclasses knowing
+        the scene coordinates of their items should override it to project them again through to_draw().
+
         You can experiments some cut off when moving fast a small item due to tkinter Canvas refresh system.
         You can fix that as described here : https://stackoverflow.com/a/47000930.
 
@@ -28,11 +33,21 @@ class CustomCanvas(Canvas):
 
         :param parent: tkinter parent Widget
         :param zoom_magnitude: zoom factor when zooming in or out
+        :param frame_rate: maximum number of item updates per second when panning or zooming
+        :param profiler: profiler.Profiler recording the pans, zooms and redraws, None to record nothing
         :param kwargs: tkinter Canvas kwargs
         """
         self.view = Rect(Vector2(0, 0), Vector2(0, 0))
+        # View and size of the Canvas as the items were last drawn
+        self.drawn_view = Rect(Vector2(0, 0), Vector2(0, 0))
+        self.drawn_size = Vector2(0, 0)
+        self.size = Vector2(0, 0)
         self.zoom_magnitude = zoom_magnitude
+        self.frame_rate = frame_rate
+        self.profiler = profiler
         self.mark = Vector2(0, 0)
+        self.redraw_pending = False
+        self.last_redraw = 0
 
         Canvas.__init__(self, parent, **kwargs)
 
@@ -54,8 +69,49 @@ class CustomCanvas(Canvas):
         Called when resizing or using tkinter's pack, grid or place methods.
         """
         super().update()
-        self.view.scale.x = self.winfo_width()
-        self.view.scale.y = self.winfo_height()
+        self.size = Vector2(self.winfo_width(), self.winfo_height())
+        self.view.scale.x = self.size.x
+        self.view.scale.y = self.size.y
+        self.__redraw()
+
+    def request_redraw(self):
+        """
+        Update the items for the current view, at most frame_rate times per second whatever the number of events
+        """
+        if self.redraw_pending:
+            return
+
+        self.redraw_pending = True
+        delay = self.last_redraw + 1 / self.frame_rate - time.perf_counter()
+        self.after(max(0, int(delay * 1000)), self.__redraw)
+
+    def __redraw(self):
+        self.redraw_pending = False
+        self.last_redraw = time.perf_counter()
+        self._view_changed()
+        if self.profiler is not None:
+            self.profiler.record("redraw", time.perf_counter() - self.last_redraw)
+        self.drawn_view = Rect(self.view.position.clone(), self.view.scale.clone())
+        self.drawn_size = self.size.clone()
+
+    def _view_changed(self):
+        """
+        Called at most once per frame after the view moved, zoomed or got resized.
+        Moves and scales all the items by the difference between the drawn view and the current one.
+        """
+        old, old_size = self.drawn_view, self.drawn_size
+        if not (old.scale.x and old.scale.y and self.view.scale.x and self.view.scale.y):
+            return
+
+        # Canvas coordinates are (scene - position) * size / scale
+        fx = self.size.x * old.scale.x / (self.view.scale.x * old_size.x)
+        fy = self.size.y * old.scale.y / (self.view.scale.y * old_size.y)
+        self.scale("all", 0, 0, fx, fy)
+        self.move(
+            "all",
+            (old.position.x - self.view.position.x) * self.size.x / self.view.scale.x,
+            (old.position.y - self.view.position.y) * self.size.y / self.view.scale.y
+        )
 
     def pan_begin(self, event):
         """
@@ -71,21 +127,25 @@ class CustomCanvas(Canvas):
         Follow the drag action and pan the view
         :param event: tkinter Event
         """
+        top = time.perf_counter()
+
         # Compute of the pan vector
         pan_vector = self.mark - Vector2(event.x, event.y)
         self.view.position.x += pan_vector.x * self.view.scale.x / self.winfo_width()
         self.view.position.y += pan_vector.y * self.view.scale.y / self.winfo_height()
 
-        # Move objects on Canvas
-        self.move("all", -pan_vector.x, -pan_vector.y)
         self.mark.x = event.x
         self.mark.y = event.y
+        self.request_redraw()
+        if self.profiler is not None:
+            self.profiler.record("pan", time.perf_counter() - top)
 
     def zoom(self, event):
         """
-        Allow zooming in the Canvas by rescaling and redrawing all the items.
+        Allow zooming in the Canvas by rescaling the view, the items are redrawn on the next frame.
         :param event: tkinter Event
         """
+        top = time.perf_counter()
 
         # Check if we are zooming in or out
         if event.delta >= 0:
@@ -101,8 +161,9 @@ class CustomCanvas(Canvas):
         self.view.position = Vector2(x - dx, y - dy)
         self.view.scale /= f
 
-        # Rescale the items
-        self.scale("all", event.x, event.y, f, f)
+        self.request_redraw()
+        if self.profiler is not None:
+            self.profiler.record("zoom", time.perf_counter() - top)
 
     def to_scene(self, p: Vector2) -> Vector2:
         """
@@ -111,8 +172,8 @@ class CustomCanvas(Canvas):
         :param p: Canvas coordinates
         :return: p converted to scene coordinates
         """
-        x = self.view.position.x + p.x * self.view.scale.x / self.winfo_width()
-        y = self.view.position.y + p.y * self.view.scale.y / self.winfo_height()
+        x = self.view.position.x + p.x * self.view.scale.x / self.size.x
+        y = self.view.position.y + p.y * self.view.scale.y / self.size.y
         to_scene = Vector2(x, y)
         return to_scene
 
@@ -123,7 +184,7 @@ class CustomCanvas(Canvas):
         :param p: Scene coordinates
         :return: p converted to Canvas coordinates
         """
-        x = (p.x - self.view.position.x) * self.winfo_width() / self.view.scale.x
-        y = (p.y - self.view.position.y) * self.winfo_height() / self.view.scale.y
+        x = (p.x - self.view.position.x) * self.size.x / self.view.scale.x
+        y = (p.y - self.view.position.y) * self.size.y / self.view.scale.y
         to_draw = Vector2(x, y)
         return to_draw
@@ -0,0 +1,168 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+from collections import deque, namedtuple
+
+from cellkey import unpack
+
+# Period and translation of a board found again: the board of generation start + period is the one of generation
+# start moved by (dx, dy)
+Cycle = namedtuple("Cycle", ("start", "period", "dx", "dy"))
+
+# Default number of recent generations remembered, so the longest period detected
+WINDOW = 1024
+
+MASK64 = (1 << 64) - 1
+# Modulus and bases of the polynomial hash: a cell (x, y) weighs BASE_X ** x * BASE_Y ** y
+PRIME = (1 << 61) - 1
+BASE_X = 0x1F3D5B79A2C4E6F
+BASE_Y = 0x2E4C6A8B0D1F357
+
+
+def zobrist(key):
+    """
+    :param key: key of a cell
+    :return: The 64 bits random looking key of the cell, XORed in the board hash (splitmix64 finalizer)
+    """
+    key = (key + 0x9E3779B97F4A7C15) & MASK64
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & MASK64
+    return key ^ (key >> 31)
+
+
+class CycleDetector:
+
+    def __init__(self, engine, window=WINDOW):
+        """
+        Detect when the board of an engine comes back to a recent state, possibly moved.
+
+        Two hashes of the board are updated from the births and deaths of each step, so the cost of a generation
+        depends on the number of changes and not on the population:
+            -the XOR of the zobrist() keys of the living cells, equal for identical boards
+            -the sum of the polynomial weights of the living cells, with the sums of their coordinates. A board moved
+             by (dx, dy) has its coordinates sums moved by population * (dx, dy) and its weights multiplied by
+             BASE_X ** dx * BASE_Y ** dy, so bringing it back to a reference position gives a signature equal for
+             all the translations of a board, like a fleet of spaceships.
+        The hashes of the last window generations are kept to find the period.
+
+        :param engine: engine to watch, update() has to be called after each of its step()
+        :param window: number of recent generations remembered
+        """
+        self.engine = engine
+        self.window = window
+        self.powers_x = {}
+        self.powers_y = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Compute the hashes of the board again and forget the previous generations, to be called after the cells
+        were edited
+        """
+        self.hash = 0
+        self.population = 0
+        self.sum_x = self.sum_y = 0
+        self.weight = 0
+        self.recent = deque()
+        self.hashes = {}
+        self.signatures = {}
+        self.__toggle(self.engine.active_cells, 1)
+        self.__remember()
+
+    def __power(self, powers, base, exponent):
+        power = powers.get(exponent)
+        if power is None:
+            power = powers[exponent] = pow(base, exponent, PRIME)
+        return power
+
+    def __toggle(self, keys, sign):
+        """
+        Add (sign 1) or remove (sign -1) cells from the hashes
+        """
+        for key in keys:
+            x, y = unpack(key)
+            self.hash ^= zobrist(key)
+            self.sum_x += sign * x
+            self.sum_y += sign * y
+            self.weight += sign * self.__power(self.powers_x, BASE_X, x) * self.__power(self.powers_y, BASE_Y, y)
+            self.population += sign
+        self.weight %= PRIME
+
+    def __position(self):
+        """
+        :return: The reference position of the board, moving by (dx, dy) when the board moves by (dx, dy)
+        """
+        if not self.population:
+            return 0, 0
+        return self.sum_x // self.population, self.sum_y // self.population
+
+    def __signature(self, x, y):
+        """
+        :return: A hash of the board moved to its reference position, equal for all its translations
+        """
+        weight = self.weight * pow(BASE_X, -x, PRIME) * pow(BASE_Y, -y, PRIME) % PRIME
+        return self.population, self.sum_x - x * self.population, self.sum_y - y * self.population, weight
+
+    def __remember(self):
+        x, y = self.__position()
+        signature = self.__signature(x, y)
+        generation = self.engine.generation
+        self.hashes.setdefault(self.hash, generation)
+        self.signatures.setdefault(signature, (generation, x, y))
+        self.recent.append((generation, self.hash, signature))
+
+        while len(self.recent) > self.window:
+            generation, old_hash, old_signature = self.recent.popleft()
+            if self.hashes.get(old_hash) == generation:
+                del self.hashes[old_hash]
+            if self.signatures.get(old_signature, (None,))[0] == generation:
+                del self.signatures[old_signature]
+
+    def update(self):
+        """
+        Update the hashes with the births and deaths of the last step of the engine
+
+        :return: The Cycle found, None if the board is new
+        """
+        self.__toggle(self.engine.births, 1)
+        self.__toggle(self.engine.deaths, -1)
+
+        generation = self.engine.generation
+        start = self.hashes.get(self.hash)
+        if start is not None:
+            cycle = Cycle(start, generation - start, 0, 0)
+        else:
+            x, y = self.__position()
+            found = self.signatures.get(self.__signature(x, y))
+            cycle = None if found is None else Cycle(found[0], generation - found[0], x - found[1], y - found[2])
+
+        self.__remember()
+        return cycle
+
+
+def fast_forward(engine, cycle, generations):
+    """
+    Move an engine whose board is in a cycle generations later, computing at most one period
+
+    :param engine: engine in the cycle
+    :param cycle: Cycle found by a CycleDetector on the engine
+    :param generations: number of generations to skip
+    """
+    periods, rest = divmod(generations, cycle.period)
+    if rest:
+        engine.step(rest)
+
+    if periods and (cycle.dx or cycle.dy):
+        dx, dy = periods * cycle.dx, periods * cycle.dy
+        cells = list(engine.cells())
+        engine.clear()
+        engine.set_cells((x + dx, y + dy) for x, y in cells)
+    engine.generation += periods * cycle.period
@@ -0,0 +1,334 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from cellkey import BIAS, SHIFT, unpack
+from engine import BulkEdit
+from rules import parse
+
+# Number of empty cells added around the living area when the array has to grow
+GROW_MARGIN = 32
+# Number of generations between two attempts to shrink the array around the living area
+SHRINK_PERIOD = 64
+
+
+def to_keys(xs, ys):
+    """
+    Vectorized cellkey.pack()
+
+    :param xs: array of columns
+    :param ys: array of rows
+    :return: A list of int keys
+    """
+    xs = xs.astype(np.int64) + BIAS
+    ys = ys.astype(np.int64) + BIAS
+    return ((ys.astype(np.uint64) << np.uint64(SHIFT)) | xs.astype(np.uint64)).tolist()
+
+
+def to_arrays(cells):
+    """
+    :param cells: iterable of (x, y) coordinates
+    :return: The arrays of the columns and rows of the cells
+    """
+    coordinates = np.fromiter(chain.from_iterable(cells), dtype=np.int64).reshape(-1, 2)
+    return coordinates[:, 0], coordinates[:, 1]
+
+
+def _within(count, first, last):
+    """
+    :return: A boolean array, True where first <= count <= last
+    """
+    if first == last:
+        return count == first
+    if first == 0:
+        return count <= last
+    if last == 8:
+        return count >= first
+    # Counts under first wrap around to large unsigned values
+    return (count - np.uint8(first)) <= last - first
+
+
+def next_generation(rule, count, alive):
+    """
+    Apply a rule with a few whole array comparisons, one per run of consecutive numbers of neighbours
+
+    :param rule: rules.Rule
+    :param count: uint8 array of the numbers of living neighbours
+    :param alive: uint8 array of the cells, 0 or 1
+    :return: A boolean array of the cells at the next generation
+    """
+    result = np.zeros(count.shape, dtype=bool)
+    for first, last in rule.both:
+        result |= _within(count, first, last)
+    if rule.survive_only:
+        living = alive.view(bool)
+        for first, last in rule.survive_only:
+            result |= _within(count, first, last) & living
+    if rule.born_only:
+        dead = alive == 0
+        for first, last in rule.born_only:
+            result |= _within(count, first, last) & dead
+    return result
+
+
+def diff(before, before_x, before_y, after, after_x, after_y):
+    """
+    Compare two uint8 arrays of cells, each with the (x, y) coordinates of its first cell
+
+    :return: Two sets with the keys of the cells born and dead between before and after
+    """
+    # Bring both arrays in a common frame
+    min_x, min_y = min(before_x, after_x), min(before_y, after_y)
+    max_x = max(before_x + before.shape[1], after_x + after.shape[1])
+    max_y = max(before_y + before.shape[0], after_y + after.shape[0])
+    old = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
+    new = np.zeros_like(old)
+    old[before_y - min_y:before_y - min_y + before.shape[0], before_x - min_x:before_x - min_x + before.shape[1]] = before
+    new[after_y - min_y:after_y - min_y + after.shape[0], after_x - min_x:after_x - min_x + after.shape[1]] = after
+
+    ys, xs = np.nonzero(new > old)
+    births = set(to_keys(xs + min_x, ys + min_y))
+    ys, xs = np.nonzero(old > new)
+    deaths = set(to_keys(xs + min_x, ys + min_y))
+    return births, deaths
+
+
+class DenseEngine(BulkEdit):
+
+    def __init__(self, cells=(), rule=None):
+        """
+        Game of life simulation storing the living area in a numpy uint8 array.
+
+        Neighbours are counted by summing the eight shifted views of the array and the rule is applied as a single
+        vectorized expression, so the cost of a generation depends on the area of the living bounding box and not
+        on the population: it is the fastest engine for dense soups.
+        The array always keeps two empty rows and columns on each side and grows or shrinks with the living area.
+
+        Same API as engine.Engine.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        self.rule = parse(rule)
+        # Cell (x, y) is stored at grid[y - origin_y, x - origin_x]
+        self.grid = np.zeros((2 * GROW_MARGIN, 2 * GROW_MARGIN), dtype=np.uint8)
+        self.origin_x = self.origin_y = -GROW_MARGIN
+        self.generation = 0
+        self._previous = None
+        self._changes = (set(), set())
+
+        self.set_cells(cells)
+
+    @property
+    def population(self):
+        return int(np.count_nonzero(self.grid))
+
+    @property
+    def active_cells(self):
+        """
+        :return: A new set with the keys of the living cells
+        """
+        ys, xs = np.nonzero(self.grid)
+        return set(to_keys(xs + self.origin_x, ys + self.origin_y))
+
+    def cells(self):
+        ys, xs = np.nonzero(self.grid)
+        return zip((xs + self.origin_x).tolist(), (ys + self.origin_y).tolist())
+
+    @property
+    def births(self):
+        return self.__changes()[0]
+
+    @property
+    def deaths(self):
+        return self.__changes()[1]
+
+    def __index(self, key):
+        x, y = unpack(key)
+        return y - self.origin_y, x - self.origin_x
+
+    def is_alive(self, key):
+        row, col = self.__index(key)
+        height, width = self.grid.shape
+        return 0 <= row < height and 0 <= col < width and bool(self.grid[row, col])
+
+    def count_around(self, key):
+        row, col = self.__index(key)
+        height, width = self.grid.shape
+        if not (0 < row < height - 1 and 0 < col < width - 1):
+            return 0
+        return int(self.grid[row - 1:row + 2, col - 1:col + 2].sum()) - int(self.grid[row, col])
+
+    def change_state(self, key):
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        x, y = unpack(key)
+        self.__fit(x, y, x, y)
+        self.grid[y - self.origin_y, x - self.origin_x] = 1
+
+    def remove(self, key):
+        if self.is_alive(key):
+            row, col = self.__index(key)
+            self.grid[row, col] = 0
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, with a single array write
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        xs, ys = to_arrays(cells)
+        if alive and len(xs):
+            self.__fit(int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+        elif not alive:
+            height, width = self.grid.shape
+            inside = ((xs >= self.origin_x) & (xs < self.origin_x + width) &
+                      (ys >= self.origin_y) & (ys < self.origin_y + height))
+            xs, ys = xs[inside], ys[inside]
+
+        rows, cols = ys - self.origin_y, xs - self.origin_x
+        changed = self.grid[rows, cols] != alive
+        self.grid[rows, cols] = alive
+        keys = set(to_keys(xs[changed], ys[changed]))
+        return (keys, set()) if alive else (set(), keys)
+
+    def fill_rect(self, min_x, min_y, max_x, max_y, alive=True):
+        if alive:
+            self.__fit(min_x, min_y, max_x, max_y)
+        else:
+            height, width = self.grid.shape
+            min_x, min_y = max(min_x, self.origin_x), max(min_y, self.origin_y)
+            max_x, max_y = min(max_x, self.origin_x + width - 1), min(max_y, self.origin_y + height - 1)
+            if min_x > max_x or min_y > max_y:
+                return set(), set()
+
+        area = self.grid[min_y - self.origin_y:max_y - self.origin_y + 1,
+                         min_x - self.origin_x:max_x - self.origin_x + 1]
+        ys, xs = np.nonzero(area != alive)
+        area[...] = alive
+        keys = set(to_keys(xs + min_x, ys + min_y))
+        return (keys, set()) if alive else (set(), keys)
+
+    def clear(self):
+        dead = self.active_cells
+        self.grid = np.zeros((2 * GROW_MARGIN, 2 * GROW_MARGIN), dtype=np.uint8)
+        self.origin_x = self.origin_y = -GROW_MARGIN
+        return set(), dead
+
+    def step(self, n=1):
+        """
+        Compute the n next generations. births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        self._previous = (self.grid.copy(), self.origin_x, self.origin_y)
+        self._changes = None
+
+        for _ in range(n):
+            self._update()
+
+    def _update(self):
+        g = self.grid
+        # Two empty rows and columns on each side: the outer ones can't be born, so only the inside is computed
+        inner = g[1:-1, 1:-1]
+        count = (
+            g[:-2, :-2] + g[:-2, 1:-1] + g[:-2, 2:] +
+            g[1:-1, :-2] + g[1:-1, 2:] +
+            g[2:, :-2] + g[2:, 1:-1] + g[2:, 2:]
+        )
+        new = np.zeros_like(g)
+        new[1:-1, 1:-1] = next_generation(self.rule, count, inner)
+        self.grid = new
+        self.generation += 1
+
+        # Keep the two empty rows and columns, then sometimes shrink the array to the living area
+        if new[1].any() or new[-2].any() or new[:, 1].any() or new[:, -2].any():
+            self.__reframe()
+        elif self.generation % SHRINK_PERIOD == 0:
+            self.__shrink()
+
+    def bounding_box(self):
+        """
+        :return: (min_x, min_y, max_x, max_y) of the living cells, None if there is none
+        """
+        rows = np.flatnonzero(self.grid.any(axis=1))
+        if not len(rows):
+            return None
+        cols = np.flatnonzero(self.grid.any(axis=0))
+        return (int(cols[0]) + self.origin_x, int(rows[0]) + self.origin_y,
+                int(cols[-1]) + self.origin_x, int(rows[-1]) + self.origin_y)
+
+    def __fit(self, min_x, min_y, max_x, max_y):
+        """
+        Grow the array so the given box and its two empty rows and columns on each side fit in
+        """
+        height, width = self.grid.shape
+        if (min_x - 2 >= self.origin_x and min_y - 2 >= self.origin_y and
+                max_x + 2 < self.origin_x + width and max_y + 2 < self.origin_y + height):
+            return
+
+        box = self.bounding_box()
+        if box is not None:
+            min_x, min_y = min(min_x, box[0]), min(min_y, box[1])
+            max_x, max_y = max(max_x, box[2]), max(max_y, box[3])
+        self.__resize(min_x, min_y, max_x, max_y)
+
+    def __reframe(self):
+        box = self.bounding_box()
+        self.__resize(*box)
+
+    def __shrink(self):
+        box = self.bounding_box()
+        height, width = self.grid.shape
+        if box is None:
+            if height * width > 4 * GROW_MARGIN * GROW_MARGIN:
+                self.grid = np.zeros((2 * GROW_MARGIN, 2 * GROW_MARGIN), dtype=np.uint8)
+                self.origin_x = self.origin_y = -GROW_MARGIN
+            return
+
+        box_area = (box[2] - box[0] + 2 * GROW_MARGIN) * (box[3] - box[1] + 2 * GROW_MARGIN)
+        if height * width > 4 * box_area:
+            self.__resize(*box)
+
+    def __resize(self, min_x, min_y, max_x, max_y):
+        """
+        Copy the array in a new one fitting the box with GROW_MARGIN empty cells around it
+        """
+        origin_x, origin_y = min_x - GROW_MARGIN, min_y - GROW_MARGIN
+        grid = np.zeros((max_y - min_y + 1 + 2 * GROW_MARGIN, max_x - min_x + 1 + 2 * GROW_MARGIN), dtype=np.uint8)
+
+        box = self.bounding_box()
+        if box is not None:
+            # Copy the living bounding box only, which always fits in the new array
+            src = self.grid[box[1] - self.origin_y:box[3] - self.origin_y + 1,
+                            box[0] - self.origin_x:box[2] - self.origin_x + 1]
+            grid[box[1] - origin_y:box[3] - origin_y + 1, box[0] - origin_x:box[2] - origin_x + 1] = src
+
+        self.grid, self.origin_x, self.origin_y = grid, origin_x, origin_y
+
+    def __changes(self):
+        """
+        Diff the array with the one saved at the beginning of the last step() call, once
+        """
+        if self._changes is None:
+            previous, origin_x, origin_y = self._previous
+            self._changes = diff(previous, origin_x, origin_y, self.grid, self.origin_x, self.origin_y)
+        return self._changes
@@ -0,0 +1,432 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import Counter
+from importlib import import_module
+from itertools import starmap
+from random import Random
+
+from cellkey import AROUND, LOW, SHIFT, pack, unpack
+from rules import parse
+
+# Number of cells from which the neighbours of a bulk edit are counted with numpy, see neighbour_counts()
+BULK_CELLS = 4096
+# Largest ratio between the area of the bounding box of a bulk edit and its number of cells for which they are
+# counted on a grid, sparser edits are counted cell by cell
+BULK_SPARSITY = 16
+# Number of cells drawn at once by random_keys()
+RANDOM_CHUNK = 1 << 20
+
+
+def neighbour_counts(keys):
+    """
+    :param keys: set of keys of cells
+    :return: An iterable of the (key, count) pairs of the cells next to at least one of them, with the number of
+             them they are next to
+    """
+    if len(keys) >= BULK_CELLS:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            counts = _grid_counts(np, keys)
+            if counts is not None:
+                return counts
+
+    counts = Counter()
+    for offset in AROUND:
+        counts.update(map(offset.__add__, keys))
+    return counts.items()
+
+
+def random_keys(min_x, min_y, max_x, max_y, density=0.5, seed=None):
+    """
+    Draw the cells of BulkEdit.random_fill(), as keys: the same seed gives the same cells
+
+    :return: A set of the keys of the living cells
+    """
+    generator = Random(seed)
+    width = max_x - min_x + 1
+    try:
+        import numpy as np
+    except ImportError:
+        random = generator.random
+        keys = set()
+        for y in range(min_y, max_y + 1):
+            first = pack(min_x, y)
+            keys.update([key for key in range(first, first + width) if random() < density])
+        return keys
+
+    keys = set()
+    columns = np.arange(width, dtype=np.int64)
+    rows = max(1, RANDOM_CHUNK // width)
+    for y in range(min_y, max_y + 1, rows):
+        count = min(rows, max_y + 1 - y) * width
+        alive = np.flatnonzero(_random_draws(np, generator, count) < density)
+        offsets = (alive // width << SHIFT) + columns[alive % width]
+        keys.update((np.uint64(pack(min_x, y)) + offsets.astype(np.uint64)).tolist())
+    return keys
+
+
+def _random_draws(np, generator, count):
+    """
+    :return: An array of the next count values of generator.random(), drawn at once: random() makes a float of
+             53 bits from two 32-bit words, 27 bits of the first and 26 of the second
+    """
+    words = np.frombuffer(generator.getrandbits(64 * count).to_bytes(8 * count, "little"), "<u4")
+    return ((words[0::2] >> 5) * 67108864.0 + (words[1::2] >> 6)) / 9007199254740992.0
+
+
+def _grid_counts(np, keys):
+    """
+    Count the neighbours of many cells at once, by adding the eight shifted copies of their grid
+
+    :return: The pairs of neighbour_counts(), None if the cells are too sparse for a grid
+    """
+    keys = np.fromiter(keys, np.uint64, len(keys))
+    xs, ys = (keys & LOW).astype(np.int64), (keys >> SHIFT).astype(np.int64)
+    min_x, min_y = int(xs.min()), int(ys.min())
+    width, height = int(xs.max()) - min_x + 1, int(ys.max()) - min_y + 1
+    if width * height > BULK_SPARSITY * len(keys):
+        return None
+
+    # One cell of margin for the cells shifted out, one more for the neighbours of the border
+    cells = np.zeros((height + 4, width + 4), np.uint8)
+    cells[ys - min_y + 2, xs - min_x + 2] = 1
+    counts = np.zeros((height + 2, width + 2), np.uint8)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx or dy:
+                counts += cells[1 - dy:height + 3 - dy, 1 - dx:width + 3 - dx]
+
+    rows, columns = np.nonzero(counts)
+    around = ((rows + (min_y - 1)).astype(np.uint64) << np.uint64(SHIFT)) | (columns + (min_x - 1)).astype(np.uint64)
+    return zip(around.tolist(), counts[rows, columns].tolist())
+
+
+class Mask:
+
+    def __init__(self):
+        self.mask = dict()
+
+    def add(self, key):
+        if key in self.mask:
+            self.mask[key] += 1
+        else:
+            self.mask[key] = 1
+
+    def remove(self, key):
+        self.mask[key] -= 1
+        if self.mask[key] == 0:
+            del self.mask[key]
+
+    def get(self, key, default=0):
+        return self.mask.get(key, default)
+
+    def items(self):
+        return self.mask.items()
+
+    def copy(self):
+        mask = Mask()
+        mask.mask = self.mask.copy()
+        return mask
+
+    def __setitem__(self, key, value):
+        self.mask[key] = value
+
+    def __getitem__(self, item):
+        return self.mask[item]
+
+    def __str__(self):
+        return str(self.mask)
+
+    def __contains__(self, item):
+        return item in self.mask
+
+    def __iter__(self):
+        return iter(self.mask)
+
+    def __len__(self):
+        return len(self.mask)
+
+
+class BulkEdit:
+    """
+    Edits of many cells at once, for the engines providing set_cells(cells, alive) and clear().
+    Like set_cells(), each edit returns two sets with the keys of the cells born and dead, for a view to draw.
+    """
+
+    def paste(self, pattern, offset=(0, 0)):
+        """
+        Bring the cells of a pattern to life
+
+        :param pattern: iterable of the (x, y) coordinates of the living cells of the pattern
+        :param offset: (x, y) translation of the pattern
+        """
+        dx, dy = offset
+        return self.set_cells((x + dx, y + dy) for x, y in pattern)
+
+    def fill_rect(self, min_x, min_y, max_x, max_y, alive=True):
+        """
+        Bring to life or kill all the cells of a rectangle, bounds included
+
+        :param alive: False to kill the cells
+        """
+        return self.set_cells(((x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)), alive)
+
+    def random_fill(self, min_x, min_y, max_x, max_y, density=0.5, seed=None):
+        """
+        Bring to life each cell of a rectangle with a probability of density, bounds included.
+        The same seed gives the same cells on every engine.
+
+        :param density: probability of a cell to be alive, between 0 and 1
+        :param seed: seed of the random generator, None for a random one
+        """
+        random = Random(seed).random
+        return self.set_cells(
+            (x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1) if random() < density
+        )
+
+
+class Engine(BulkEdit):
+
+    def __init__(self, cells=(), rule=None):
+        """
+        Headless game of life simulation, free of any tkinter dependency.
+
+        Cells are identified by their packed int key (see cellkey.py): active_cells, births, deaths and the
+        add(), remove(), is_alive() and change_state() functions all use keys, while cells() and the constructor
+        use (x, y) coordinates.
+
+        The live neighbours count of every cell next to a living one is kept up to date on each change in the mask,
+        so a generation only has to look at the cells that may change.
+        After each call to step(), births and deaths hold the cells which changed, so a view only has to draw those.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        self.rule = parse(rule)
+        self.active_cells = set()
+        self.mask = Mask()
+        self.generation = 0
+        self.births = set()
+        self.deaths = set()
+
+        self.set_cells(cells)
+
+    @property
+    def population(self):
+        """
+        :return: The number of living cells
+        """
+        return len(self.active_cells)
+
+    def cells(self):
+        """
+        :return: An iterator over the (x, y) coordinates of the living cells
+        """
+        return map(unpack, self.active_cells)
+
+    def is_alive(self, key):
+        return key in self.active_cells
+
+    def count_around(self, key):
+        """
+        :param key: key of the cell
+        :return: The number of living neighbours of the cell
+        """
+        return self.mask.get(key)
+
+    def change_state(self, key):
+        """
+        Switch the state of a cell
+
+        :param key: key of the cell
+        :return: True if the cell is now alive
+        """
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        if key in self.active_cells:
+            return
+
+        self.active_cells.add(key)
+        mask = self.mask.mask
+        for offset in AROUND:
+            around = key + offset
+            mask[around] = mask.get(around, 0) + 1
+
+    def remove(self, key):
+        if key not in self.active_cells:
+            return
+
+        self.active_cells.remove(key)
+        mask = self.mask.mask
+        for offset in AROUND:
+            around = key + offset
+            count = mask[around] - 1
+            if count:
+                mask[around] = count
+            else:
+                del mask[around]
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, updating the mask in a single pass
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        return self.set_keys(set(starmap(pack, cells)), alive)
+
+    def set_keys(self, keys, alive=True):
+        """
+        Like set_cells(), with a set of keys, which is modified
+
+        :param keys: set of the keys of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        if alive:
+            keys -= self.active_cells
+            self._apply(keys, set())
+            return keys, set()
+
+        keys &= self.active_cells
+        self._apply(set(), keys)
+        return set(), keys
+
+    def random_fill(self, min_x, min_y, max_x, max_y, density=0.5, seed=None):
+        return self.set_keys(random_keys(min_x, min_y, max_x, max_y, density, seed))
+
+    def clear(self):
+        """
+        Kill all the cells
+
+        :return: Two sets with the keys of the cells born and dead
+        """
+        dead = self.active_cells
+        self.active_cells = set()
+        self.mask = Mask()
+        return set(), dead
+
+    def _apply(self, born, dead):
+        """
+        Add the born cells and remove the dead ones, which must not already be respectively alive and dead.
+        The neighbours of all the cells are counted at once, instead of updating the mask cell by cell.
+        """
+        self.active_cells |= born
+        self.active_cells -= dead
+        mask = self.mask.mask
+
+        if born:
+            counts = neighbour_counts(born)
+            if mask:
+                for key, count in counts:
+                    mask[key] = mask.get(key, 0) + count
+            else:
+                mask.update(counts)
+
+        if dead:
+            for key, count in neighbour_counts(dead):
+                count = mask[key] - count
+                if count:
+                    mask[key] = count
+                else:
+                    del mask[key]
+
+    def step(self, n=1):
+        """
+        Compute the n next generations. births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        births, deaths = set(), set()
+        for _ in range(n):
+            born, dead = self._update()
+            merge_changes(births, deaths, born, dead)
+
+        self.births, self.deaths = births, deaths
+
+    def _update(self):
+        """
+        Compute the next generation
+
+        :return: Two lists with the keys of the cells born and dead during this generation
+        """
+        active, mask = self.active_cells, self.mask.mask
+        birth, survival = self.rule.birth, self.rule.survival
+        born = [key for key, count in mask.items() if birth[count] and key not in active]
+        dead = [key for key in active if not survival[mask.get(key, 0)]]
+
+        for key in born:
+            self.add(key)
+        for key in dead:
+            self.remove(key)
+
+        self.generation += 1
+        return born, dead
+
+
+def merge_changes(births, deaths, born, dead):
+    """
+    Merge the changes of a generation into accumulated change sets.
+    A cell born then dead (or the reverse) in the meantime is removed from both sets.
+
+    :param births: accumulated set of born cells, updated in place
+    :param deaths: accumulated set of dead cells, updated in place
+    :param born: cells born during the generation
+    :param dead: cells dead during the generation
+    """
+    for key in born:
+        if key in deaths:
+            deaths.remove(key)
+        else:
+            births.add(key)
+
+    for key in dead:
+        if key in births:
+            births.remove(key)
+        else:
+            deaths.add(key)
+
+
+# Available engines by name, with their module and class. Modules are only imported when their engine is created,
+# so optional dependencies like numpy are only needed by the engines using them.
+ENGINES = {
+    "sparse": ("engine", "Engine"),
+    "tiled": ("tiled_engine", "TiledEngine"),
+    "dense": ("dense_engine", "DenseEngine"),
+    "bitboard": ("bitboard_engine", "BitboardEngine"),
+    "hashlife": ("hashlife_engine", "HashLifeEngine"),
+    "parallel": ("parallel_engine", "ParallelEngine"),
+    "paged": ("paged_engine", "PagedEngine"),
+}
+
+
+def create_engine(name="sparse", cells=(), **kwargs):
+    """
+    :param name: name of the engine, a key of ENGINES
+    :param cells: iterable of the initial living cells (x, y) coordinates
+    :param kwargs: engine specific options
+    :return: A new engine
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name!r}, expected one of {', '.join(ENGINES)}")
+
+    module, cls = ENGINES[name]
+    return getattr(import_module(module), cls)(cells, **kwargs)
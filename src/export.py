@@ -0,0 +1,327 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import argparse
+import io
+import os
+import struct
+import sys
+import time
+import zlib
+from multiprocessing import Process, Queue
+from queue import Full
+
+import numpy as np
+from PIL import GifImagePlugin, Image, ImageColor
+
+import patterns
+from engine import create_engine
+from raster import density
+from settings import ACTIVE_CELL_COLOR, BACKGROUND_COLOR, ENGINE, RULE
+from vector2 import Vector2
+
+# Export of long runs as animations without any window. The engine is stepped and each frame rasterized in this
+# process while a worker process encodes the previous ones, and frames wait in a bounded queue in between, so the
+# memory doesn't depend on the number of frames.
+#   python export.py pattern.rle run.gif --frames 1000 --scale 4
+#   python export.py pattern.rle frames --frames 100000 --skip 10 --region -500 -500 499 499
+
+# Maximum number of frames waiting to be encoded
+QUEUE_SIZE = 8
+# Number of colors from the background to the cells, to shade the pixels covering several cells
+LEVELS = 16
+# Cells around the initial pattern in the default region
+MARGIN = 16
+# Time in ms each frame is shown
+DURATION = 50
+# Number of frames between two progress lines
+LOG_PERIOD = 100
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def palette(color=ACTIVE_CELL_COLOR, background=BACKGROUND_COLOR, levels=LEVELS):
+    """
+    :param color: color of the living cells, as a tkinter color name or #rrggbb
+    :param background: color of the dead cells
+    :return: The flat list of the RGB values of the levels colors from background to color
+    """
+    color, background = ImageColor.getrgb(color)[:3], ImageColor.getrgb(background)[:3]
+    return [round(b + (c - b) * level / (levels - 1)) for level in range(levels) for c, b in zip(color, background)]
+
+
+def frames(engine, region, count, scale=1.0, skip=1, levels=LEVELS):
+    """
+    Step an engine and rasterize a region of each frame
+
+    :param engine: engine to run, from its current generation
+    :param region: (min_x, min_y, max_x, max_y) of the cells to draw, bounds included
+    :param count: number of frames
+    :param scale: size of a cell in px, cells smaller than a pixel are shaded by their density
+    :param skip: number of generations between two frames
+    :param levels: number of colors, see palette()
+    :return: An iterator over uint8 arrays of the colors indices of the frames
+    """
+    min_x, min_y, max_x, max_y = region
+    columns, rows = max_x - min_x + 1, max_y - min_y + 1
+    width, height = max(1, round(columns * scale)), max(1, round(rows * scale))
+    position, size = Vector2(min_x, min_y), Vector2(columns, rows)
+
+    for index in range(count):
+        if index:
+            engine.step(skip)
+        # The paged engine only reads the tiles of the region
+        keys = engine.query(*region) if hasattr(engine, "query") else engine.active_cells
+        shades = density(keys, position, size, 1, width, height)
+        yield (shades * (levels - 1) + 0.5).astype(np.uint8)
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _chunks(png):
+    """
+    :param png: content of a PNG file
+    :return: An iterator over the (type, data) of its chunks
+    """
+    offset = len(PNG_SIGNATURE)
+    while offset < len(png):
+        length, kind = struct.unpack(">I4s", png[offset:offset + 8])
+        yield kind, png[offset + 8:offset + 8 + length]
+        offset += length + 12
+
+
+class GifWriter:
+
+    def __init__(self, path, duration):
+        """
+        Write the frames of a looping GIF one by one, with the palette of the first one
+        """
+        self.file = open(path, "wb")
+        self.duration = duration
+        self.started = False
+
+    def write(self, image):
+        if not self.started:
+            header, _ = GifImagePlugin.getheader(image, None, {"loop": 0, "optimize": False})
+            self.file.writelines(header)
+            self.started = True
+        self.file.writelines(GifImagePlugin.getdata(image, duration=self.duration))
+
+    def close(self):
+        self.file.write(b";")
+        self.file.close()
+
+
+class ApngWriter:
+
+    def __init__(self, path, duration):
+        """
+        Write the frames of a looping animated PNG one by one. Each frame is encoded as a PNG whose image data is
+        copied in frame chunks, and the number of frames is written in the header once known.
+        """
+        self.file = open(path, "wb")
+        self.duration = duration
+        self.frames = 0
+        self.sequence = 0
+        # Offset of the animation control chunk
+        self.control = None
+
+    def write(self, image):
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        chunks = list(_chunks(buffer.getvalue()))
+
+        if not self.frames:
+            self.file.write(PNG_SIGNATURE)
+            self.file.write(_chunk(*chunks[0]))
+            self.control = self.file.tell()
+            self.file.write(_chunk(b"acTL", struct.pack(">II", 0, 0)))
+            for kind, data in chunks[1:]:
+                if kind in (b"PLTE", b"tRNS"):
+                    self.file.write(_chunk(kind, data))
+
+        width, height = image.size
+        self.file.write(_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, width, height, 0, 0,
+                                                     self.duration, 1000, 0, 0)))
+        self.sequence += 1
+        for kind, data in chunks:
+            if kind != b"IDAT":
+                continue
+            if self.frames:
+                self.file.write(_chunk(b"fdAT", struct.pack(">I", self.sequence) + data))
+                self.sequence += 1
+            else:
+                self.file.write(_chunk(b"IDAT", data))
+        self.frames += 1
+
+    def close(self):
+        self.file.write(_chunk(b"IEND", b""))
+        if self.control is not None:
+            self.file.seek(self.control)
+            self.file.write(_chunk(b"acTL", struct.pack(">II", self.frames, 0)))
+        self.file.close()
+
+
+class FramesWriter:
+
+    def __init__(self, path, duration):
+        """
+        Write each frame in a PNG file of a directory, frame_000000.png first
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.frames = 0
+
+    def write(self, image):
+        image.save(os.path.join(self.path, f"frame_{self.frames:06d}.png"))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+# Writers by file extension, the other paths being directories of frames
+WRITERS = {
+    ".gif": GifWriter,
+    ".png": ApngWriter,
+    ".apng": ApngWriter,
+}
+
+
+def writer_of(path):
+    return WRITERS.get(os.path.splitext(path)[1].lower(), FramesWriter)
+
+
+def encode(path, queue, colors, duration):
+    """
+    Encoder process: write the frames received from the queue until None
+
+    :param path: path of a .gif, .png or .apng file, or of a directory of PNG files
+    :param queue: multiprocessing Queue of the ((width, height), bytes of the colors indices) of the frames
+    :param colors: palette of the frames, see palette()
+    :param duration: time in ms each frame is shown
+    """
+    writer = writer_of(path)(path, duration)
+    while True:
+        frame = queue.get()
+        if frame is None:
+            break
+        size, data = frame
+        image = Image.frombytes("P", size, data)
+        image.putpalette(colors)
+        writer.write(image)
+    writer.close()
+
+
+def _put(queue, worker, item):
+    """
+    Put an item in the queue of the encoder, without waiting forever if it failed
+    """
+    while True:
+        try:
+            queue.put(item, timeout=1)
+            return
+        except Full:
+            if not worker.is_alive():
+                raise RuntimeError("The encoder process stopped") from None
+
+
+def default_region(engine, margin=MARGIN):
+    """
+    :return: The bounding box of the living cells of the engine with a margin around it
+    """
+    cells = list(engine.cells())
+    if not cells:
+        raise ValueError("No living cell to export")
+    xs, ys = zip(*cells)
+    return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+
+def export(engine, path, count, region=None, scale=1.0, skip=1, duration=DURATION,
+           color=ACTIVE_CELL_COLOR, background=BACKGROUND_COLOR, log=None):
+    """
+    Record the next generations of an engine in an animation, encoded in a worker process
+
+    :param engine: engine to run, from its current generation
+    :param path: path of a .gif, .png or .apng file, or of a directory of PNG files
+    :param count: number of frames
+    :param region: (min_x, min_y, max_x, max_y) of the cells to draw, see default_region() by default
+    :param scale: size of a cell in px
+    :param skip: number of generations between two frames
+    :param duration: time in ms each frame is shown
+    :param color: color of the living cells
+    :param background: color of the dead cells
+    :param log: function called with a line of progress, None for silence
+    """
+    if region is None:
+        region = default_region(engine)
+
+    queue = Queue(QUEUE_SIZE)
+    worker = Process(target=encode, args=(path, queue, palette(color, background), duration), daemon=True)
+    worker.start()
+    top = time.perf_counter()
+    try:
+        for index, frame in enumerate(frames(engine, region, count, scale, skip)):
+            height, width = frame.shape
+            _put(queue, worker, ((width, height), frame.tobytes()))
+            if log is not None and (index + 1) % LOG_PERIOD == 0:
+                log(f"{index + 1}/{count} frames, {(index + 1) / (time.perf_counter() - top):.1f} frames/s")
+        _put(queue, worker, None)
+        worker.join()
+    finally:
+        if worker.is_alive():
+            worker.terminate()
+
+    if worker.exitcode:
+        raise RuntimeError(f"The encoder process failed with exit code {worker.exitcode}")
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Export the run of a pattern as a GIF, an animated PNG or frames")
+    parser.add_argument("pattern", help="pattern file: .rle, .lif, .life, .cells or .mc")
+    parser.add_argument("output", help=".gif, .png or .apng file, or directory of PNG frames")
+    parser.add_argument("--frames", type=int, default=100, help="number of frames")
+    parser.add_argument("--skip", type=int, default=1, help="generations between two frames")
+    parser.add_argument("--scale", type=float, default=1.0, help="size of a cell in px, may be under 1")
+    parser.add_argument("--region", nargs=4, type=int, metavar=("MIN_X", "MIN_Y", "MAX_X", "MAX_Y"),
+                        help="cells to draw, the initial pattern and a margin by default")
+    parser.add_argument("--duration", type=int, default=DURATION, help="time in ms each frame is shown")
+    parser.add_argument("--engine", default=ENGINE)
+    parser.add_argument("--rule", help="the rule of the pattern file or of the settings by default")
+    parser.add_argument("--color", default=ACTIVE_CELL_COLOR)
+    parser.add_argument("--background", default=BACKGROUND_COLOR)
+    options = parser.parse_args(arguments)
+
+    def log(line):
+        print(line, file=sys.stderr)
+
+    try:
+        # The rule of the pattern file, unless another one is given
+        rule = options.rule or patterns.read_rule(options.pattern) or RULE
+        engine = create_engine(options.engine, patterns.read(options.pattern), rule=rule)
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"Can't open {options.pattern}: {error}")
+
+    top = time.perf_counter()
+    try:
+        export(engine, options.output, options.frames, options.region, options.scale, options.skip,
+               options.duration, options.color, options.background, log)
+    except (OSError, ValueError, RuntimeError) as error:
+        raise SystemExit(f"Can't export {options.output}: {error}")
+    finally:
+        if hasattr(engine, "close"):
+            engine.close()
+    log(f"{options.frames} frames of {options.pattern} in {time.perf_counter() - top:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import argparse
+import sys
+import time
+
+from settings import ENGINE, RULE
+
+# Entry point of the app. Without a command it opens the window, the GUI modules (tkinter, PIL) being imported only
+# then, so the headless commands start quickly and run without a display:
+#   python -m golpy run pattern.rle --gens 100000 --engine hashlife --stats
+#   python -m golpy run pattern.rle --gens 1000000 --every 10000 --checkpoint run.snapshot
+#   python -m golpy run --resume run.snapshot --gens 1000000 --every 10000 --checkpoint run.snapshot
+#   python -m golpy gui
+
+
+def run(options):
+    """
+    Load a pattern or a snapshot, simulate it up to a generation and print the statistics of the run
+    """
+    import patterns
+    from checkpoint import Snapshot, load_snapshot, save_snapshot
+    from engine import ENGINES, create_engine
+    from rules import parse
+
+    if (options.pattern is None) == (options.resume is None):
+        raise SystemExit("Expected either a pattern or --resume")
+
+    if options.engine not in ENGINES:
+        raise SystemExit(f"Unknown engine {options.engine!r}, expected one of {', '.join(ENGINES)}")
+    # The rule of the pattern file or of the snapshot, unless another one is given
+    try:
+        rule = parse(options.rule) if options.rule else None
+    except ValueError as error:
+        raise SystemExit(error)
+    source = options.pattern or options.resume
+    try:
+        if options.resume is not None:
+            with Snapshot(options.resume) as snapshot:
+                saved = snapshot.rule
+            # Going on with another rule would mix two simulations in the checkpoints
+            if rule is not None and rule != saved:
+                raise SystemExit(f"{options.resume} is a {saved} simulation, it can't go on with {rule}")
+            rule = saved
+        elif rule is None:
+            rule = patterns.read_rule(options.pattern)
+        rule = parse(rule or RULE)
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"Can't open {source}: {error}")
+
+    try:
+        if options.resume is None:
+            engine = create_engine(options.engine, patterns.read(options.pattern), rule=rule)
+        else:
+            engine = create_engine(options.engine, rule=rule)
+            load_snapshot(options.resume, engine)
+    except (OSError, ValueError) as error:
+        raise SystemExit(f"Can't open {source}: {error}")
+
+    def checkpoint():
+        try:
+            save_snapshot(options.checkpoint, engine)
+        except OSError as error:
+            raise SystemExit(f"Can't save {options.checkpoint}: {error}")
+
+    # A resumed run goes on from the generation of the snapshot
+    first = engine.generation
+    every = options.every or options.gens
+    top = time.perf_counter()
+    if options.stats:
+        print("generation population time gen/s")
+        print(f"{engine.generation} {engine.population} 0.000 -")
+
+    while engine.generation < options.gens:
+        engine.step(min(every, options.gens - engine.generation))
+        if options.checkpoint:
+            checkpoint()
+        if options.stats:
+            elapsed = time.perf_counter() - top
+            print(f"{engine.generation} {engine.population} {elapsed:.3f} "
+                  f"{(engine.generation - first) / elapsed:.1f}", flush=True)
+
+    elapsed = time.perf_counter() - top
+    print(f"{engine.generation - first} generations of {source} in {elapsed:.3f} s with the {options.engine} engine, "
+          f"population {engine.population} at generation {engine.generation}", file=sys.stderr)
+
+    if options.output:
+        try:
+            patterns.write(options.output, engine.cells(), engine.rule)
+        except (OSError, ValueError) as error:
+            raise SystemExit(f"Can't save {options.output}: {error}")
+
+    if hasattr(engine, "close"):
+        engine.close()
+
+
+def gui(options):
+    from window import Window
+
+    Window().mainloop()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog="golpy", description="Game of life")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="open the window (default)").set_defaults(function=gui)
+
+    runner = commands.add_parser("run", help="simulate a pattern without any window")
+    runner.add_argument("pattern", nargs="?", help="pattern file: .rle, .lif, .life, .cells or .mc")
+    runner.add_argument("--resume", metavar="SNAPSHOT", help="snapshot file to start from instead of a pattern")
+    runner.add_argument("--gens", type=int, default=1000, help="generation to simulate up to")
+    runner.add_argument("--engine", default=ENGINE, help="simulation engine, see engine.ENGINES")
+    runner.add_argument("--rule", help="Life-like rule, like B36/S23 or highlife, the one of the pattern file or "
+                                       "of the settings by default")
+    runner.add_argument("--stats", action="store_true", help="print the generation, population, time and speed")
+    runner.add_argument("--every", type=int, help="generations between two lines of statistics, --gens by default")
+    runner.add_argument("--output", help="pattern file to save the last generation in")
+    runner.add_argument("--checkpoint", metavar="SNAPSHOT",
+                        help="snapshot file saved every --every generations, to go on later with --resume")
+    runner.set_defaults(function=run)
+
+    options = parser.parse_args(arguments)
+    getattr(options, "function", gui)(options)
+
+
+if __name__ == '__main__':
+    main()
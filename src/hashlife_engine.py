@@ -0,0 +1,442 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import OrderedDict
+from itertools import starmap
+
+from cellkey import pack, unpack
+from engine import BulkEdit
+from rules import parse
+
+# Default number of quadtree nodes kept before a garbage collection, about 150 bytes each
+MAX_NODES = 4_000_000
+# Default number of memoized results kept, least recently used ones are evicted first
+MAX_RESULTS = 2_000_000
+
+
+class Node:
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population")
+
+    def __init__(self, level, nw=None, ne=None, sw=None, se=None, population=0):
+        """
+        Square of 2 ** level cells side, made of four squares of the level below.
+        Nodes are unique (see HashLifeEngine.node()), so they are compared by identity.
+        """
+        self.level = level
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+
+
+DEAD = Node(0)
+ALIVE = Node(0, population=1)
+# Leaves by state
+LEAVES = (DEAD, ALIVE)
+
+
+class HashLifeEngine(BulkEdit):
+
+    def __init__(self, cells=(), max_nodes=MAX_NODES, max_results=MAX_RESULTS, rule=None):
+        """
+        HashLife simulation: the world is a quadtree of unique nodes, and the future of each node is memoized,
+        so repetitive patterns (guns, breeders, methuselahs) can jump 2 ** k generations at once with jump(k).
+
+        Memory is bounded: memoized results are evicted in least recently used order past max_results, and when
+        there are more than max_nodes nodes after a jump, the nodes unreachable from the world are dropped.
+
+        Same API as engine.Engine. The root is always centered on (0, 0).
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param max_nodes: number of nodes above which a garbage collection is done after a jump
+        :param max_results: number of memoized results kept
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        self.rule = parse(rule)
+        # Computed on the first generation
+        self.block_table = None
+        self.max_nodes = max_nodes
+        self.max_results = max_results
+        self.nodes = {}
+        self.results = OrderedDict()
+        self.empty = [DEAD]
+        self.generation = 0
+        self._previous = None
+        self._changes = (set(), set())
+
+        self.root = self.__build(list(cells))
+
+    # Nodes
+
+    def node(self, nw, ne, sw, se):
+        """
+        :return: The unique node with these four quadrants
+        """
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw.level + 1, nw, ne, sw, se,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    def empty_node(self, level):
+        while len(self.empty) <= level:
+            e = self.empty[-1]
+            self.empty.append(self.node(e, e, e, e))
+        return self.empty[level]
+
+    def __build(self, cells, level=3):
+        for x, y in cells:
+            while not (-(1 << (level - 1)) <= x < 1 << (level - 1) and -(1 << (level - 1)) <= y < 1 << (level - 1)):
+                level += 1
+        half = 1 << (level - 1)
+        return self.__build_node(cells, level, -half, -half)
+
+    def __build_node(self, cells, level, x0, y0):
+        if not cells:
+            return self.empty_node(level)
+        if level == 0:
+            return ALIVE
+
+        half = 1 << (level - 1)
+        quadrants = ([], [], [], [])
+        for cell in cells:
+            quadrants[(cell[0] >= x0 + half) + 2 * (cell[1] >= y0 + half)].append(cell)
+
+        return self.node(
+            self.__build_node(quadrants[0], level - 1, x0, y0),
+            self.__build_node(quadrants[1], level - 1, x0 + half, y0),
+            self.__build_node(quadrants[2], level - 1, x0, y0 + half),
+            self.__build_node(quadrants[3], level - 1, x0 + half, y0 + half)
+        )
+
+    def expand(self, node):
+        """
+        :return: A node one level up with node in its center
+        """
+        e = self.empty_node(node.level - 1)
+        return self.node(
+            self.node(e, e, e, node.nw),
+            self.node(e, e, node.ne, e),
+            self.node(e, node.sw, e, e),
+            self.node(node.se, e, e, e)
+        )
+
+    def centre(self, node):
+        return self.node(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def __horizontal(self, w, e):
+        return self.node(w.ne, e.nw, w.se, e.sw)
+
+    def __vertical(self, n, s):
+        return self.node(n.sw, n.se, s.nw, s.ne)
+
+    # Evolution
+
+    def successor(self, node, j):
+        """
+        :param node: node of level k >= 2
+        :param j: the result is 2 ** j generations later, j <= k - 2
+        :return: The center of node, of level k - 1, 2 ** j generations later
+        """
+        if node.population == 0:
+            return node.nw
+
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            return result
+
+        if node.level == 2:
+            result = self.__base(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            parts = (
+                nw, self.__horizontal(nw, ne), ne,
+                self.__vertical(nw, sw), self.centre(node), self.__vertical(ne, se),
+                sw, self.__horizontal(sw, se), se
+            )
+            if j == node.level - 2:
+                # Full speed: advance twice by 2 ** (k - 3)
+                j -= 1
+                p = [self.successor(part, j) for part in parts]
+            else:
+                p = [self.centre(part) for part in parts]
+
+            result = self.node(
+                self.successor(self.node(p[0], p[1], p[3], p[4]), j),
+                self.successor(self.node(p[1], p[2], p[4], p[5]), j),
+                self.successor(self.node(p[3], p[4], p[6], p[7]), j),
+                self.successor(self.node(p[4], p[5], p[7], p[8]), j)
+            )
+
+        self.results[key] = result
+        if len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+        return result
+
+    def __base(self, node):
+        """
+        :param node: node of level 2, 4x4 cells
+        :return: The 2x2 center of node, one generation later
+        """
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        # Cell (x, y) of the block is the bit y * 4 + x, see rules.Rule.block_table()
+        block = (
+            nw.nw.population | nw.ne.population << 1 | ne.nw.population << 2 | ne.ne.population << 3 |
+            nw.sw.population << 4 | nw.se.population << 5 | ne.sw.population << 6 | ne.se.population << 7 |
+            sw.nw.population << 8 | sw.ne.population << 9 | se.nw.population << 10 | se.ne.population << 11 |
+            sw.sw.population << 12 | sw.se.population << 13 | se.sw.population << 14 | se.se.population << 15
+        )
+        if self.block_table is None:
+            self.block_table = self.rule.block_table()
+        result = self.block_table[block]
+        return self.node(LEAVES[result & 1], LEAVES[result >> 1 & 1], LEAVES[result >> 2 & 1], LEAVES[result >> 3])
+
+    def jump(self, k):
+        """
+        Compute the world 2 ** k generations later in a single pass
+
+        :param k: power of two of the number of generations
+        """
+        self.__save()
+        self.__jump(k)
+        self.collect()
+
+    def step(self, n=1):
+        """
+        Compute the n next generations, with one jump for each bit of n.
+        births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        self.__save()
+        k = 0
+        while n:
+            if n & 1:
+                self.__jump(k)
+                self.collect()
+            n >>= 1
+            k += 1
+
+    def __jump(self, k):
+        # The pattern must fit in the center quarter of the root and grow at most 2 ** (level - 3) cells on each side
+        root = self.root
+        while (root.level < k + 3 or
+               root.nw.population != root.nw.se.se.population or
+               root.ne.population != root.ne.sw.sw.population or
+               root.sw.population != root.sw.ne.ne.population or
+               root.se.population != root.se.nw.nw.population):
+            root = self.expand(root)
+
+        self.root = self.successor(root, k)
+        self.generation += 1 << k
+
+    def collect(self):
+        """
+        Drop the nodes unreachable from the world and all the memoized results if there are more than max_nodes nodes
+        """
+        if len(self.nodes) <= self.max_nodes:
+            return
+
+        nodes = {}
+        stack = [self.root, self.empty[-1]]
+        if self._previous is not None:
+            stack.append(self._previous)
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in nodes:
+                nodes[key] = node
+                stack.extend(key)
+
+        self.nodes = nodes
+        self.results.clear()
+
+    # Engine API
+
+    @property
+    def population(self):
+        return self.root.population
+
+    @property
+    def active_cells(self):
+        """
+        :return: A new set with the keys of the living cells
+        """
+        return {pack(x, y) for x, y in self.cells()}
+
+    def cells(self):
+        half = 1 << (self.root.level - 1)
+        stack = [(self.root, -half, -half)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                yield x, y
+                continue
+            half = 1 << (node.level - 1)
+            stack.append((node.nw, x, y))
+            stack.append((node.ne, x + half, y))
+            stack.append((node.sw, x, y + half))
+            stack.append((node.se, x + half, y + half))
+
+    @property
+    def births(self):
+        return self.__changes()[0]
+
+    @property
+    def deaths(self):
+        return self.__changes()[1]
+
+    def __fit(self, x, y):
+        half = 1 << (self.root.level - 1)
+        while not (-half <= x < half and -half <= y < half):
+            self.root = self.expand(self.root)
+            half <<= 1
+
+    def __get(self, x, y):
+        node = self.root
+        half = 1 << (node.level - 1)
+        if not (-half <= x < half and -half <= y < half):
+            return 0
+        x, y = x + half, y + half
+        while node.level > 0 and node.population:
+            half = 1 << (node.level - 1)
+            if y < half:
+                node = node.nw if x < half else node.ne
+            else:
+                node = node.sw if x < half else node.se
+            x, y = x % half, y % half
+        return node.population
+
+    def __set(self, node, x, y, leaf):
+        """
+        :return: A copy of node with the cell at (x, y) relative to its top left corner replaced by leaf
+        """
+        if node.level == 0:
+            return leaf
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if y < half:
+            if x < half:
+                nw = self.__set(nw, x, y, leaf)
+            else:
+                ne = self.__set(ne, x - half, y, leaf)
+        else:
+            if x < half:
+                sw = self.__set(sw, x, y - half, leaf)
+            else:
+                se = self.__set(se, x - half, y - half, leaf)
+        return self.node(nw, ne, sw, se)
+
+    def is_alive(self, key):
+        return bool(self.__get(*unpack(key)))
+
+    def count_around(self, key):
+        x, y = unpack(key)
+        return sum(self.__get(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+
+    def change_state(self, key):
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        x, y = unpack(key)
+        self.__fit(x, y)
+        half = 1 << (self.root.level - 1)
+        self.root = self.__set(self.root, x + half, y + half, ALIVE)
+
+    def remove(self, key):
+        x, y = unpack(key)
+        if self.__get(x, y):
+            half = 1 << (self.root.level - 1)
+            self.root = self.__set(self.root, x + half, y + half, DEAD)
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once: a few cells are set one by one, and when there are more of them
+        than living cells the quadtree is built again at once.
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        keys = set(starmap(pack, cells))
+        if len(keys) < self.population:
+            keys = {key for key in keys if self.is_alive(key) != alive}
+            for key in keys:
+                if alive:
+                    self.add(key)
+                else:
+                    self.remove(key)
+        else:
+            active = self.active_cells
+            if alive:
+                keys -= active
+                active |= keys
+            else:
+                keys &= active
+                active -= keys
+            self.root = self.__build(list(map(unpack, active)))
+
+        return (keys, set()) if alive else (set(), keys)
+
+    def clear(self):
+        dead = self.active_cells
+        self.root = self.__build([])
+        return set(), dead
+
+    def __save(self):
+        self._previous = self.root
+        self._changes = None
+
+    def __changes(self):
+        """
+        Diff the world with the one saved at the beginning of the last step() or jump() call, once.
+        Identical subtrees are skipped, so the cost depends on the changes and not on the population.
+        """
+        if self._changes is not None:
+            return self._changes
+
+        before, after = self._previous, self.root
+        while before.level < after.level:
+            before = self.expand(before)
+        while after.level < before.level:
+            after = self.expand(after)
+
+        births, deaths = set(), set()
+        half = 1 << (before.level - 1)
+        stack = [(before, after, -half, -half)]
+        while stack:
+            old, new, x, y = stack.pop()
+            if old is new:
+                continue
+            if old.level == 0:
+                (births if new.population else deaths).add(pack(x, y))
+                continue
+            half = 1 << (old.level - 1)
+            stack.append((old.nw, new.nw, x, y))
+            stack.append((old.ne, new.ne, x + half, y))
+            stack.append((old.sw, new.sw, x, y + half))
+            stack.append((old.se, new.se, x + half, y + half))
+
+        self._changes = (births, deaths)
+        return self._changes
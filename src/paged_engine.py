@@ -0,0 +1,443 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import mmap
+import tempfile
+from collections import OrderedDict
+from threading import RLock
+
+from bitplanes import count_bits, next_bits, row_sums
+from cellkey import AROUND, LOW, SHIFT, offset, pack, tile_of as _tile_of, unpack
+from engine import BulkEdit
+from rules import parse
+
+# Tiles are squares of 2 ** TILE_SHIFT cells side, packed in an int: cell (x, y) of the tile is the bit y * TILE_SIZE + x
+TILE_SHIFT = 6
+TILE_SIZE = 1 << TILE_SHIFT
+TILE_BYTES = TILE_SIZE * TILE_SIZE // 8
+# Number of tiles kept in memory, the others are paged out to a file
+CACHE_TILES = 16384
+# Number of tiles the file is created for, it doubles when full
+INITIAL_SLOTS = 1024
+
+_ROW = (1 << TILE_SIZE) - 1
+_FULL = (1 << TILE_SIZE * TILE_SIZE) - 1
+_FIRST_COLUMN = sum(1 << TILE_SIZE * y for y in range(TILE_SIZE))
+_LAST_COLUMN = _FIRST_COLUMN << (TILE_SIZE - 1)
+_LAST_ROW = TILE_SIZE * (TILE_SIZE - 1)
+# Offsets of the tiles around a tile and itself, from north west to south east
+_NEIGHBOURHOOD = tuple(offset(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+_TILE_AROUND = (0,) + AROUND
+
+
+def tile_of(key):
+    """
+    :param key: key of a cell
+    :return: The key of its tile, packed like a cell key with tile coordinates
+    """
+    return _tile_of(key, TILE_SHIFT)
+
+
+def bit_of(key):
+    """
+    :param key: key of a cell
+    :return: The index of the cell bit in its tile
+    """
+    return ((key >> SHIFT) & (TILE_SIZE - 1)) << TILE_SHIFT | (key & (TILE_SIZE - 1))
+
+
+def tile_keys(tile, bits):
+    """
+    :param tile: key of a tile
+    :param bits: cells of the tile
+    :return: An iterator over the keys of the cells
+    """
+    x0, y0 = (tile & LOW) << TILE_SHIFT, (tile >> SHIFT) << TILE_SHIFT
+    for y in range(TILE_SIZE):
+        row = bits >> (y * TILE_SIZE) & _ROW
+        while row:
+            low = row & -row
+            yield (y0 + y) << SHIFT | (x0 + low.bit_length() - 1)
+            row ^= low
+
+
+def _row_sums(row, west_tile, east_tile, row_shift):
+    """
+    :param row: cells of a row of a tile
+    :param west_tile: cells of the tile west of it
+    :param east_tile: cells of the tile east of it
+    :param row_shift: position of the row in the tiles
+    :return: The 2 bits sums of the three cells of each cell of the row
+    """
+    west = (row << 1) & _ROW | (west_tile >> (row_shift + TILE_SIZE - 1)) & 1
+    east = row >> 1 | ((east_tile >> row_shift) & 1) << (TILE_SIZE - 1)
+    return row_sums(west, row, east)[:2]
+
+
+def next_tile(rule, nw, n, ne, w, c, e, sw, s, se):
+    """
+    :param rule: rules.Rule
+    :return: The next generation of the tile c, from its cells and the ones of its eight neighbours
+    """
+    # West and east neighbours of every cell, carrying the bits of the west and east tiles
+    west = (c << 1) & (_FULL ^ _FIRST_COLUMN) | (w >> (TILE_SIZE - 1)) & _FIRST_COLUMN
+    east = (c >> 1) & (_FULL ^ _LAST_COLUMN) | (e << (TILE_SIZE - 1)) & _LAST_COLUMN
+    row0, row1, side0, side1 = row_sums(west, c, east)
+
+    # The first row is below the last row of the north tiles, and the last one above the first row of the south ones
+    above0, above1 = _row_sums(n >> _LAST_ROW, nw, ne, _LAST_ROW)
+    below0, below1 = _row_sums(s & _ROW, sw, se, 0)
+    top = (row0 << TILE_SIZE) & _FULL | above0, (row1 << TILE_SIZE) & _FULL | above1
+    bottom = row0 >> TILE_SIZE | below0 << _LAST_ROW, row1 >> TILE_SIZE | below1 << _LAST_ROW
+
+    bits = count_bits(top, (side0, side1), bottom)
+    return next_bits(rule, bits, c, int) & _FULL
+
+
+class TileStore:
+
+    def __init__(self, capacity=CACHE_TILES, directory=None):
+        """
+        Tiles kept in a least recently used cache of ints, the others being paged out to a memory mapped file.
+        Empty tiles are not stored. Only the slot and the population of each tile stay in memory.
+        Thread safe, so a view can read tiles while a simulation thread writes them.
+
+        :param capacity: number of tiles kept in memory
+        :param directory: directory of the temporary file, the system one by default
+        """
+        self.capacity = capacity
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.map = None
+        self.lock = RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # Tiles in memory, from least to most recently used, and the ones modified since written to the file
+            self.cache = OrderedDict()
+            self.dirty = set()
+            # Slot in the file and population by tile, for every non empty tile
+            self.slots = {}
+            self.free = []
+            self.counts = {}
+            self.population = 0
+            self.used = 0
+            self.__resize(INITIAL_SLOTS)
+
+    def __resize(self, slots):
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(slots * TILE_BYTES)
+        self.map = mmap.mmap(self.file.fileno(), slots * TILE_BYTES)
+        self.size = slots
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, tile):
+        return tile in self.counts
+
+    def tiles(self):
+        """
+        :return: A list of the keys of the non empty tiles
+        """
+        with self.lock:
+            return list(self.counts)
+
+    def get(self, tile):
+        """
+        :return: The cells of the tile, read from the file and cached if it was paged out
+        """
+        with self.lock:
+            bits = self.cache.get(tile)
+            if bits is not None:
+                self.cache.move_to_end(tile)
+                return bits
+            if tile not in self.counts:
+                return 0
+
+            bits = self.__read(tile)
+            self.cache[tile] = bits
+            self.__evict()
+            return bits
+
+    def peek(self, tile):
+        """
+        :return: The cells of the tile, without caching it, to read all the tiles without evicting the used ones
+        """
+        with self.lock:
+            bits = self.cache.get(tile)
+            if bits is not None:
+                return bits
+            return self.__read(tile) if tile in self.counts else 0
+
+    def set(self, tile, bits):
+        with self.lock:
+            count = bits.bit_count()
+            self.population += count - self.counts.get(tile, 0)
+            if bits:
+                self.counts[tile] = count
+                self.cache[tile] = bits
+                self.cache.move_to_end(tile)
+                self.dirty.add(tile)
+                self.__evict()
+                return
+
+            self.counts.pop(tile, None)
+            self.cache.pop(tile, None)
+            self.dirty.discard(tile)
+            slot = self.slots.pop(tile, None)
+            if slot is not None:
+                self.free.append(slot)
+
+    def __read(self, tile):
+        start = self.slots[tile] * TILE_BYTES
+        return int.from_bytes(self.map[start:start + TILE_BYTES], "little")
+
+    def __write(self, tile, bits):
+        slot = self.slots.get(tile)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                if self.used == self.size:
+                    self.__resize(2 * self.size)
+                slot = self.used
+                self.used += 1
+            self.slots[tile] = slot
+        start = slot * TILE_BYTES
+        self.map[start:start + TILE_BYTES] = bits.to_bytes(TILE_BYTES, "little")
+
+    def __evict(self):
+        while len(self.cache) > self.capacity:
+            tile, bits = self.cache.popitem(last=False)
+            if tile in self.dirty:
+                self.dirty.remove(tile)
+                self.__write(tile, bits)
+
+    def close(self):
+        with self.lock:
+            self.map.close()
+            self.file.close()
+
+
+class TileIndex:
+
+    def __init__(self, engine):
+        """
+        Spatial index of a CellGrid reading the tiles of a PagedEngine, instead of holding all the cells in memory.
+        The engine is already up to date, so adding and removing cells does nothing.
+
+        :param engine: PagedEngine
+        """
+        self.engine = engine
+
+    def add(self, key):
+        pass
+
+    def remove(self, key):
+        pass
+
+    def query(self, min_x, min_y, max_x, max_y):
+        return self.engine.query(min_x, min_y, max_x, max_y)
+
+
+class PagedEngine(BulkEdit):
+
+    def __init__(self, cells=(), rule=None, cache_tiles=CACHE_TILES, directory=None):
+        """
+        Game of life simulation storing the world as tiles of 64x64 cells packed in ints, for patterns too large to
+        fit in memory.
+
+        Only the least recently used tiles are kept in memory, the others are paged out to a temporary memory mapped
+        file, so the size of the world is limited by the disk. A generation only computes the tiles next to the ones
+        which changed in the previous generation, in row order, so the active frontier stays in the cache.
+        Each tile is computed at once with bitwise full adders on its int.
+
+        Same API as engine.Engine, but active_cells reads all the tiles: a view should use query() instead, like the
+        CellGrid does with view_index.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        :param cache_tiles: number of tiles kept in memory
+        :param directory: directory of the tiles files, the system temporary one by default
+        """
+        self.rule = parse(rule)
+        self.store = TileStore(cache_tiles, directory)
+        self.generation = 0
+        # Tiles which changed in the last generation or were edited since, the only ones whose neighbourhood may change
+        self.active_tiles = set()
+        # Tiles changed by the last step() call, with their cells before it, to find the births and deaths
+        self._changed = set()
+        self._before = TileStore(max(1, cache_tiles // 16), directory)
+        self._changes = (set(), set())
+
+        self.set_cells(cells)
+
+    @property
+    def population(self):
+        return self.store.population
+
+    @property
+    def active_cells(self):
+        """
+        :return: A new set with the keys of the living cells
+        """
+        return set(self.__keys())
+
+    def cells(self):
+        return map(unpack, self.__keys())
+
+    def __keys(self):
+        for tile in self.store.tiles():
+            yield from tile_keys(tile, self.store.peek(tile))
+
+    @property
+    def view_index(self):
+        return TileIndex(self)
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """
+        Read only the tiles in a box
+
+        :return: An iterator over the keys of the cells in the box, bounds included
+        """
+        min_key, max_key = pack(min_x, min_y), pack(max_x, max_y)
+        low, high = tile_of(min_key), tile_of(max_key)
+        low_x, low_y, high_x, high_y = low & LOW, low >> SHIFT, high & LOW, high >> SHIFT
+
+        # Look for the tiles in the box, or for the box in the tiles when there are fewer tiles
+        if (high_x - low_x + 1) * (high_y - low_y + 1) <= len(self.store):
+            tiles = ((ty << SHIFT) | tx for ty in range(low_y, high_y + 1) for tx in range(low_x, high_x + 1))
+        else:
+            tiles = sorted(tile for tile in self.store.tiles()
+                           if low_y <= tile >> SHIFT <= high_y and low_x <= tile & LOW <= high_x)
+
+        min_key_x, min_key_y, max_key_x, max_key_y = min_key & LOW, min_key >> SHIFT, max_key & LOW, max_key >> SHIFT
+        for tile in tiles:
+            if tile not in self.store:
+                continue
+            for key in tile_keys(tile, self.store.get(tile)):
+                if min_key_x <= key & LOW <= max_key_x and min_key_y <= key >> SHIFT <= max_key_y:
+                    yield key
+
+    @property
+    def births(self):
+        return self.__changes()[0]
+
+    @property
+    def deaths(self):
+        return self.__changes()[1]
+
+    def __changes(self):
+        """
+        Compare the tiles changed by the last step() call with their saved cells, once
+        """
+        if self._changes is None:
+            births, deaths = set(), set()
+            for tile in self._changed:
+                before, after = self._before.get(tile), self.store.get(tile)
+                births.update(tile_keys(tile, after & ~before))
+                deaths.update(tile_keys(tile, before & ~after))
+            self._changes = births, deaths
+        return self._changes
+
+    def is_alive(self, key):
+        return bool(self.store.get(tile_of(key)) >> bit_of(key) & 1)
+
+    def count_around(self, key):
+        return sum(self.is_alive(key + around) for around in AROUND)
+
+    def change_state(self, key):
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        self.set_cells((unpack(key),))
+
+    def remove(self, key):
+        self.set_cells((unpack(key),), False)
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, writing each tile once
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        masks = {}
+        for x, y in cells:
+            key = pack(x, y)
+            tile = tile_of(key)
+            masks[tile] = masks.get(tile, 0) | 1 << bit_of(key)
+
+        keys = set()
+        for tile, mask in masks.items():
+            bits = self.store.get(tile)
+            changed = mask & ~bits if alive else mask & bits
+            if changed:
+                self.store.set(tile, bits | mask if alive else bits & ~mask)
+                self.active_tiles.add(tile)
+                keys.update(tile_keys(tile, changed))
+        return (keys, set()) if alive else (set(), keys)
+
+    def clear(self):
+        dead = self.active_cells
+        self.store.clear()
+        self.active_tiles = set()
+        return set(), dead
+
+    def step(self, n=1):
+        """
+        Compute the n next generations. births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        self._changed = set()
+        self._before.clear()
+        self._changes = None
+
+        for _ in range(n):
+            self._update()
+
+    def _update(self):
+        store, rule = self.store, self.rule
+        compute = sorted({tile + around for tile in self.active_tiles for around in _TILE_AROUND})
+
+        # All the tiles are computed before writing any, their neighbours being needed as they were
+        new_tiles = {}
+        for tile in compute:
+            neighbourhood = [store.get(tile + around) for around in _NEIGHBOURHOOD]
+            if not any(neighbourhood):
+                continue
+            bits = next_tile(rule, *neighbourhood)
+            if bits != neighbourhood[4]:
+                new_tiles[tile] = bits
+                if tile not in self._changed:
+                    self._changed.add(tile)
+                    self._before.set(tile, neighbourhood[4])
+
+        for tile, bits in new_tiles.items():
+            store.set(tile, bits)
+        self.active_tiles = set(new_tiles)
+        self.generation += 1
+
+    def close(self):
+        """
+        Delete the tiles files
+        """
+        self.store.close()
+        self._before.close()
@@ -0,0 +1,340 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import weakref
+from multiprocessing import Barrier, Process
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from cellkey import unpack
+from dense_engine import diff, next_generation, to_arrays, to_keys
+from engine import BulkEdit
+from rules import parse
+
+# Number of empty cells added around the living area when the board has to grow
+GROW_MARGIN = 256
+
+# Layout of the control block shared with the workers
+COMMAND, PARITY, COUNT, DONE, OVERFLOW = range(5)
+CONTROL_SIZE = OVERFLOW + 2
+RUN, STOP = 0, 1
+
+
+def step_rows(src, dst, first, last, rule):
+    """
+    Compute the rows [first, last[ of dst, the next generation of src with the rules.Rule.
+    Rows and columns 0 and -1 are left empty.
+    """
+    first, last = max(first, 1), min(last, src.shape[0] - 1)
+    if first >= last:
+        return
+    g = src[first - 1:last + 1]
+    count = (
+        g[:-2, :-2] + g[:-2, 1:-1] + g[:-2, 2:] +
+        g[1:-1, :-2] + g[1:-1, 2:] +
+        g[2:, :-2] + g[2:, 1:-1] + g[2:, 2:]
+    )
+    dst[first:last, 1:-1] = next_generation(rule, count, g[1:-1, 1:-1])
+
+
+def touches_border(grid, first, last):
+    """
+    :return: True if a living cell of the rows [first, last[ lies in the second outermost rows or columns
+    """
+    height = grid.shape[0]
+    first, last = max(first, 1), min(last, height - 1)
+    return bool(
+        (first <= 1 < last and grid[1].any()) or
+        (first <= height - 2 < last and grid[height - 2].any()) or
+        grid[first:last, 1].any() or grid[first:last, -2].any()
+    )
+
+
+def _work(names, shape, first, last, rule, start, generation, done):
+    """
+    Worker process: computes its strip of rows each generation until told to stop.
+    Rows next to the strip (the halo) are read straight from the shared board of the previous generation.
+    """
+    blocks = [SharedMemory(name=name) for name in names]
+    grids = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf) for block in blocks[:2]]
+    control = np.ndarray((CONTROL_SIZE,), dtype=np.int64, buffer=blocks[2].buf)
+
+    try:
+        while True:
+            start.wait()
+            if control[COMMAND] == STOP:
+                break
+
+            parity, count = int(control[PARITY]), int(control[COUNT])
+            for i in range(count):
+                src, dst = grids[parity], grids[1 - parity]
+                step_rows(src, dst, first, last, rule)
+                # Overflow flags alternate so a fast worker can't raise the next one before the others read this one
+                if touches_border(dst, first, last):
+                    control[OVERFLOW + i % 2] = 1
+                generation.wait()
+                parity = 1 - parity
+                if control[OVERFLOW + i % 2] or i == count - 1:
+                    if first == 1:
+                        control[DONE] = i + 1
+                    break
+
+            done.wait()
+    finally:
+        del grids, control
+        for block in blocks:
+            block.close()
+
+
+def _shutdown(workers, blocks, start, control):
+    control[COMMAND] = STOP
+    if any(worker.is_alive() for worker in workers):
+        start.wait()
+    for worker in workers:
+        worker.join()
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+class ParallelEngine(BulkEdit):
+
+    def __init__(self, cells=(), processes=None, rule=None):
+        """
+        Game of life simulation split over several processes.
+
+        The board is a numpy uint8 array (like dense_engine.DenseEngine) held twice in shared memory, for the current
+        and the next generation. Each worker process computes a strip of rows, reading the rows around its strip
+        from the current board, and all the workers meet at a barrier after each generation.
+        When the living area reaches the border the workers stop, and the board is copied in a larger one.
+        Results are identical to the other engines.
+
+        Same API as engine.Engine. Call close() to stop the workers and free the shared memory.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param processes: number of worker processes, os.cpu_count() by default
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        self.rule = parse(rule)
+        self.processes = processes or os.cpu_count() or 1
+        self.generation = 0
+        self._previous = None
+        self._changes = (set(), set())
+        self._finalize = None
+
+        xs, ys = to_arrays(cells)
+        if len(xs):
+            box = (int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+        else:
+            box = (0, 0, 0, 0)
+        self.__allocate(*box, None)
+        self.grid[ys - self.origin_y, xs - self.origin_x] = 1
+
+    @property
+    def grid(self):
+        """
+        :return: The board of the current generation
+        """
+        return self.grids[self.parity]
+
+    def __allocate(self, min_x, min_y, max_x, max_y, previous):
+        """
+        Create a shared board fitting the box with GROW_MARGIN empty cells around it, copy previous in it and start
+        the workers
+
+        :param previous: None or (array, x, y) of cells to copy, with the coordinates of its first cell
+        """
+        origin_x, origin_y = min_x - GROW_MARGIN, min_y - GROW_MARGIN
+        shape = (max_y - min_y + 1 + 2 * GROW_MARGIN, max_x - min_x + 1 + 2 * GROW_MARGIN)
+        size = shape[0] * shape[1]
+        blocks = [SharedMemory(create=True, size=size) for _ in range(2)]
+        blocks.append(SharedMemory(create=True, size=CONTROL_SIZE * 8))
+        grids = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf) for block in blocks[:2]]
+        control = np.ndarray((CONTROL_SIZE,), dtype=np.int64, buffer=blocks[2].buf)
+        for grid in grids:
+            grid.fill(0)
+        control.fill(0)
+
+        if previous is not None:
+            grid, x, y = previous
+            grids[0][y - origin_y:y - origin_y + grid.shape[0], x - origin_x:x - origin_x + grid.shape[1]] = grid
+
+        # Strips of rows, one per worker
+        processes = max(1, min(self.processes, shape[0] - 2))
+        bounds = [1 + (shape[0] - 2) * i // processes for i in range(processes + 1)]
+        start, generation, done = Barrier(processes + 1), Barrier(processes), Barrier(processes + 1)
+        names = [block.name for block in blocks]
+        workers = [
+            Process(target=_work, args=(names, shape, bounds[i], bounds[i + 1], self.rule, start, generation, done),
+                    daemon=True)
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        self.origin_x, self.origin_y = origin_x, origin_y
+        self.grids, self.control, self.parity = grids, control, 0
+        self.start, self.done = start, done
+        self._finalize = weakref.finalize(self, _shutdown, workers, blocks, start, control)
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory
+        """
+        self.grids = [grid.copy() for grid in self.grids]
+        self.control = self.control.copy()
+        self._finalize()
+
+    def __reframe(self, min_x, min_y, max_x, max_y):
+        previous = None
+        box = self.bounding_box()
+        if box is not None:
+            # Only the living bounding box is copied, it always fits in the new board
+            previous = (self.grid[box[1] - self.origin_y:box[3] - self.origin_y + 1,
+                                  box[0] - self.origin_x:box[2] - self.origin_x + 1].copy(), box[0], box[1])
+            min_x, min_y = min(min_x, box[0]), min(min_y, box[1])
+            max_x, max_y = max(max_x, box[2]), max(max_y, box[3])
+        self.close()
+        self.__allocate(min_x, min_y, max_x, max_y, previous)
+
+    def step(self, n=1):
+        """
+        Compute the n next generations. births and deaths are then the net changes over those n generations.
+
+        :param n: number of generations to compute
+        """
+        self._previous = (self.grid.copy(), self.origin_x, self.origin_y)
+        self._changes = None
+
+        while n > 0:
+            control = self.control
+            control[COMMAND], control[PARITY], control[COUNT] = RUN, self.parity, n
+            control[DONE] = control[OVERFLOW] = control[OVERFLOW + 1] = 0
+            self.start.wait()
+            self.done.wait()
+
+            count = int(control[DONE])
+            self.parity = (self.parity + count) % 2
+            self.generation += count
+            n -= count
+            if control[OVERFLOW] or control[OVERFLOW + 1]:
+                self.__reframe(*self.bounding_box())
+
+    # Engine API
+
+    @property
+    def population(self):
+        return int(np.count_nonzero(self.grid))
+
+    @property
+    def active_cells(self):
+        ys, xs = np.nonzero(self.grid)
+        return set(to_keys(xs + self.origin_x, ys + self.origin_y))
+
+    def cells(self):
+        ys, xs = np.nonzero(self.grid)
+        return zip((xs + self.origin_x).tolist(), (ys + self.origin_y).tolist())
+
+    @property
+    def births(self):
+        return self.__changes()[0]
+
+    @property
+    def deaths(self):
+        return self.__changes()[1]
+
+    def bounding_box(self):
+        """
+        :return: (min_x, min_y, max_x, max_y) of the living cells, None if there is none
+        """
+        rows = np.flatnonzero(self.grid.any(axis=1))
+        if not len(rows):
+            return None
+        cols = np.flatnonzero(self.grid.any(axis=0))
+        return (int(cols[0]) + self.origin_x, int(rows[0]) + self.origin_y,
+                int(cols[-1]) + self.origin_x, int(rows[-1]) + self.origin_y)
+
+    def __index(self, key):
+        x, y = unpack(key)
+        return y - self.origin_y, x - self.origin_x
+
+    def is_alive(self, key):
+        row, col = self.__index(key)
+        height, width = self.grid.shape
+        return 0 <= row < height and 0 <= col < width and bool(self.grid[row, col])
+
+    def count_around(self, key):
+        row, col = self.__index(key)
+        height, width = self.grid.shape
+        if not (0 < row < height - 1 and 0 < col < width - 1):
+            return 0
+        return int(self.grid[row - 1:row + 2, col - 1:col + 2].sum()) - int(self.grid[row, col])
+
+    def change_state(self, key):
+        if self.is_alive(key):
+            self.remove(key)
+            return False
+
+        self.add(key)
+        return True
+
+    def add(self, key):
+        x, y = unpack(key)
+        row, col = self.__index(key)
+        height, width = self.grid.shape
+        if not (2 <= row < height - 2 and 2 <= col < width - 2):
+            self.__reframe(x, y, x, y)
+            row, col = self.__index(key)
+        self.grid[row, col] = 1
+
+    def remove(self, key):
+        if self.is_alive(key):
+            row, col = self.__index(key)
+            self.grid[row, col] = 0
+
+    def set_cells(self, cells, alive=True):
+        """
+        Bring to life or kill many cells at once, with a single write in the shared board
+
+        :param cells: iterable of the (x, y) coordinates of the cells
+        :param alive: False to kill the cells
+        :return: Two sets with the keys of the cells born and dead
+        """
+        xs, ys = to_arrays(cells)
+        height, width = self.grid.shape
+        if alive and len(xs):
+            min_x, min_y, max_x, max_y = int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max())
+            if not (min_x - 2 >= self.origin_x and min_y - 2 >= self.origin_y and
+                    max_x + 2 < self.origin_x + width and max_y + 2 < self.origin_y + height):
+                self.__reframe(min_x, min_y, max_x, max_y)
+        elif not alive:
+            inside = ((xs >= self.origin_x) & (xs < self.origin_x + width) &
+                      (ys >= self.origin_y) & (ys < self.origin_y + height))
+            xs, ys = xs[inside], ys[inside]
+
+        grid = self.grid
+        rows, cols = ys - self.origin_y, xs - self.origin_x
+        changed = grid[rows, cols] != alive
+        grid[rows, cols] = alive
+        keys = set(to_keys(xs[changed], ys[changed]))
+        return (keys, set()) if alive else (set(), keys)
+
+    def clear(self):
+        dead = self.active_cells
+        self.grid.fill(0)
+        return set(), dead
+
+    def __changes(self):
+        if self._changes is None:
+            previous, origin_x, origin_y = self._previous
+            self._changes = diff(previous, origin_x, origin_y, self.grid, self.origin_x, self.origin_y)
+        return self._changes
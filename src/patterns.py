@@ -0,0 +1,337 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import mmap
+import os
+import re
+from functools import partial
+
+from rules import CONWAY, parse
+
+# Run length encoded token: optional count then a state or $ (end of row) or ! (end of pattern)
+RLE_TOKEN = re.compile(rb"(\d*)([^\d\s])")
+# Maximum length of the lines written in RLE files
+RLE_LINE_LENGTH = 70
+# Rule of the header line of RLE files, like "x = 3, y = 3, rule = B36/S23", without the topology after ":"
+RLE_RULE = re.compile(rb"rule\s*=\s*([^\s,:]+)", re.IGNORECASE)
+
+
+def _lines(data, start=0):
+    """
+    :param data: bytes-like object
+    :param start: offset of the first line
+    :return: An iterator over the (offset of the line, stripped line) of data, without copying it all
+    """
+    size = len(data)
+    while start < size:
+        end = data.find(b"\n", start)
+        if end < 0:
+            end = size
+        yield start, bytes(data[start:end]).strip()
+        start = end + 1
+
+
+def read_rle(data):
+    """
+    :param data: bytes-like content of a RLE file
+    :return: An iterator over the (x, y) coordinates of the living cells
+    """
+    x0 = y0 = 0
+    body = len(data)
+    for start, line in _lines(data):
+        if line.startswith((b"#P", b"#R")):
+            x0, y0 = (int(v) for v in line[2:].split()[:2])
+        elif line and not line.startswith((b"#", b"x")):
+            body = start
+            break
+
+    x, y = x0, y0
+    for match in RLE_TOKEN.finditer(data, body):
+        count, tag = int(match.group(1) or 1), match.group(2)
+        if tag in b"b.":
+            x += count
+        elif tag == b"$":
+            x, y = x0, y + count
+        elif tag == b"!":
+            return
+        else:
+            for i in range(count):
+                yield x + i, y
+            x += count
+
+
+def read_rle_rule(data):
+    """
+    :param data: bytes-like content of a RLE file
+    :return: The rule of its header line as written, None if it has none
+    """
+    for _, line in _lines(data):
+        if line.startswith(b"x"):
+            match = RLE_RULE.search(line)
+            return match.group(1).decode() if match else None
+        if line and not line.startswith(b"#"):
+            return None
+    return None
+
+
+def _read_comment_rule(data, prefix):
+    """
+    :param data: bytes-like content of a Life 1.06, plaintext or Macrocell file
+    :param prefix: start of the comment line holding the rule, like b"#R"
+    :return: The rule of the comment lines before the cells, None if they have none
+    """
+    for _, line in _lines(data):
+        if line.startswith(prefix):
+            return line[len(prefix):].strip().decode()
+        if line and not line.startswith((b"#", b"!", b"[")):
+            return None
+    return None
+
+
+def write_rle(file, cells, rule=None):
+    """
+    :param file: binary file object
+    :param cells: iterable of the (x, y) coordinates of the living cells
+    :param rule: Life-like rule written in the header, see rules.parse()
+    """
+    rule = parse(rule)
+    cells = sorted(cells, key=lambda cell: (cell[1], cell[0]))
+    if not cells:
+        file.write(f"x = 0, y = 0, rule = {rule}\n!\n".encode())
+        return
+
+    min_x = min(x for x, _ in cells)
+    min_y, max_y = cells[0][1], cells[-1][1]
+    max_x = max(x for x, _ in cells)
+    file.write(f"#R {min_x} {min_y}\nx = {max_x - min_x + 1}, y = {max_y - min_y + 1}, rule = {rule}\n".encode())
+
+    line = []
+    length = 0
+
+    def emit(count, tag):
+        nonlocal length
+        token = (str(count) if count > 1 else "") + tag
+        if length + len(token) > RLE_LINE_LENGTH:
+            file.write("".join(line).encode() + b"\n")
+            line.clear()
+            length = 0
+        line.append(token)
+        length += len(token)
+
+    x, y = min_x, min_y
+    run_start = run_end = None
+    for cx, cy in cells:
+        if cy != y or (run_end is not None and cx != run_end):
+            if run_start is not None:
+                emit(run_end - run_start, "o")
+                run_start = None
+            if cy != y:
+                emit(cy - y, "$")
+                x, y = min_x, cy
+        if run_start is None:
+            if cx > x:
+                emit(cx - x, "b")
+            run_start = run_end = cx
+        run_end = cx + 1
+        x = run_end
+
+    emit(run_end - run_start, "o")
+    emit(1, "!")
+    file.write("".join(line).encode() + b"\n")
+
+
+def read_life106(data):
+    """
+    :param data: bytes-like content of a Life 1.06 file, one "x y" line per living cell
+    :return: An iterator over the (x, y) coordinates of the living cells
+    """
+    for _, line in _lines(data):
+        if line and not line.startswith(b"#"):
+            x, y = line.split()[:2]
+            yield int(x), int(y)
+
+
+def write_life106(file, cells, rule=None):
+    file.write(b"#Life 1.06\n")
+    # The format has no rule, it's only written in a comment when it isn't the default one
+    rule = parse(rule)
+    if rule != CONWAY:
+        file.write(f"#R {rule}\n".encode())
+    for x, y in cells:
+        file.write(f"{x} {y}\n".encode())
+
+
+def read_plaintext(data):
+    """
+    :param data: bytes-like content of a plaintext file, one row of . (dead) and O (alive) per line
+    :return: An iterator over the (x, y) coordinates of the living cells
+    """
+    y = 0
+    for _, line in _lines(data):
+        if line.startswith(b"!"):
+            continue
+        for x, state in enumerate(line):
+            if state in b"O*":
+                yield x, y
+        y += 1
+
+
+def write_plaintext(file, cells, rule=None):
+    cells = sorted(cells, key=lambda cell: (cell[1], cell[0]))
+    file.write(b"!Name: golpy\n")
+    # Like Life 1.06, only written in a comment when it isn't the default rule
+    rule = parse(rule)
+    if rule != CONWAY:
+        file.write(f"!Rule: {rule}\n".encode())
+    if not cells:
+        return
+
+    min_x = min(x for x, _ in cells)
+    y, row = cells[0][1], bytearray()
+    for cx, cy in cells:
+        if cy != y:
+            file.write(bytes(row) + b"\n" * (cy - y))
+            y, row = cy, bytearray()
+        row += b"." * (cx - min_x - len(row)) + b"O"
+    file.write(bytes(row) + b"\n")
+
+
+def read_macrocell(data):
+    """
+    :param data: bytes-like content of a Macrocell file, a quadtree with 8x8 leaves
+    :return: An iterator over the (x, y) coordinates of the living cells, the root being centered on (0, 0)
+    """
+    # Nodes are (level, leaf rows or children indices), 0 is the empty node
+    nodes = [None]
+    for _, line in _lines(data):
+        if not line or line.startswith((b"[", b"#")):
+            continue
+        if line[0] in b".*$":
+            nodes.append((3, line.split(b"$")[:8]))
+        else:
+            level, *children = (int(v) for v in line.split()[:5])
+            nodes.append((level, children))
+
+    if len(nodes) == 1:
+        return
+
+    level = nodes[-1][0]
+    stack = [(len(nodes) - 1, -(1 << (level - 1)), -(1 << (level - 1)))]
+    while stack:
+        index, x, y = stack.pop()
+        if not index:
+            continue
+        level, content = nodes[index]
+        if level == 3:
+            for dy, row in enumerate(content):
+                for dx, state in enumerate(row):
+                    if state == ord("*"):
+                        yield x + dx, y + dy
+            continue
+        half = 1 << (level - 1)
+        nw, ne, sw, se = content
+        stack.extend(((nw, x, y), (ne, x + half, y), (sw, x, y + half), (se, x + half, y + half)))
+
+
+def write_macrocell(file, cells, rule=None):
+    # Imported here so reading patterns doesn't load the HashLife engine
+    from hashlife_engine import HashLifeEngine
+
+    engine = HashLifeEngine(cells)
+    file.write(f"[M2] (golpy)\n#R {parse(rule)}\n".encode())
+
+    def leaf(node, x, y, level, rows):
+        """ Fill the 8x8 rows with the cells of node """
+        if node.population == 0:
+            return
+        if level == 0:
+            rows[y][x] = "*"
+            return
+        half = 1 << (level - 1)
+        leaf(node.nw, x, y, level - 1, rows)
+        leaf(node.ne, x + half, y, level - 1, rows)
+        leaf(node.sw, x, y + half, level - 1, rows)
+        leaf(node.se, x + half, y + half, level - 1, rows)
+
+    # Write the children before their parents, each node once
+    indices = {}
+    stack = [(engine.root, False)]
+    while stack:
+        node, ready = stack.pop()
+        if node.population == 0 or node in indices:
+            continue
+        if node.level == 3:
+            rows = [["."] * 8 for _ in range(8)]
+            leaf(node, 0, 0, 3, rows)
+            file.write("".join("".join(row).rstrip(".") + "$" for row in rows).rstrip("$").encode() + b"$\n")
+        elif ready:
+            children = (indices.get(child, 0) for child in (node.nw, node.ne, node.sw, node.se))
+            file.write(f"{node.level} {' '.join(map(str, children))}\n".encode())
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in (node.se, node.sw, node.ne, node.nw))
+            continue
+        indices[node] = len(indices) + 1
+
+
+# Readers, writers and rule readers by file extension
+FORMATS = {
+    ".rle": (read_rle, write_rle, read_rle_rule),
+    ".lif": (read_life106, write_life106, partial(_read_comment_rule, prefix=b"#R")),
+    ".life": (read_life106, write_life106, partial(_read_comment_rule, prefix=b"#R")),
+    ".cells": (read_plaintext, write_plaintext, partial(_read_comment_rule, prefix=b"!Rule:")),
+    ".mc": (read_macrocell, write_macrocell, partial(_read_comment_rule, prefix=b"#R")),
+}
+
+
+def _format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown pattern format {extension!r}, expected one of {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def read(path):
+    """
+    Read a pattern file lazily: the file is memory mapped and cells are generated while parsing it
+
+    :param path: path of a .rle, .lif, .life, .cells or .mc file
+    :return: An iterator over the (x, y) coordinates of the living cells
+    """
+    reader = _format(path)[0]
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from reader(data)
+
+
+def read_rule(path):
+    """
+    :param path: path of a .rle, .lif, .life, .cells or .mc file
+    :return: The rule of the pattern as written in the file, see rules.parse(), None if it has none
+    """
+    reader = _format(path)[2]
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return reader(data)
+
+
+def write(path, cells, rule=None):
+    """
+    :param path: path of a .rle, .lif, .life, .cells or .mc file
+    :param cells: iterable of the (x, y) coordinates of the living cells
+    :param rule: Life-like rule of the pattern, see rules.parse(), Conway's rule by default
+    """
+    writer = _format(path)[1]
+    with open(path, "wb") as file:
+        writer(file, cells, rule)
@@ -0,0 +1,155 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import csv
+import json
+import os
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from threading import Lock
+
+# A measure: perf_counter() time at its end, name of the measured part, duration in seconds, and a dict of values
+# like the population or the number of births
+Sample = namedtuple("Sample", ("time", "name", "duration", "values"))
+
+# Default number of samples kept, the oldest ones are dropped first
+CAPACITY = 4096
+# Samples are also counted by part in buckets of RATE_RESOLUTION seconds, kept for RATE_HISTORY seconds, so rates
+# don't depend on how many samples of the other parts fill the buffer
+RATE_RESOLUTION = 0.01
+RATE_HISTORY = 10.0
+
+
+class Profiler:
+
+    def __init__(self, capacity=CAPACITY):
+        """
+        Ring buffer of timings and counters recorded by the simulation thread, the view and the canvas.
+        Recording a sample is cheap enough to be left on: nothing is computed until the samples are read.
+
+        Parts recorded by Golpy:
+            -step: a step() of the engine, with the population, births, deaths and render queue depth
+            -changes: reading the births and deaths of the engine, computed lazily by some engines
+            -render: drawing a frame of changes on the canvas, with the number of births, deaths and canvas items
+            -loop: delay of the render loop callback behind its schedule, time spent by the Tk event loop elsewhere
+            -pan, zoom: handling a pan or zoom event
+            -redraw: projecting the grid and cells again after the view changed
+
+        :param capacity: maximum number of samples kept
+        """
+        self.buffer = deque(maxlen=capacity)
+        # [start time, number of samples] buckets by part, oldest first
+        self.counts = {}
+        self.lock = Lock()
+
+    def record(self, name, duration=0.0, **values):
+        """
+        :param name: name of the measured part
+        :param duration: duration in seconds
+        :param values: counters to store with the duration
+        """
+        now = time.perf_counter()
+        with self.lock:
+            self.buffer.append(Sample(now, name, duration, values))
+            buckets = self.counts.get(name)
+            if buckets is None:
+                buckets = self.counts[name] = deque()
+            if buckets and now < buckets[-1][0] + RATE_RESOLUTION:
+                buckets[-1][1] += 1
+            else:
+                buckets.append([now, 1])
+                while buckets[0][0] < now - RATE_HISTORY:
+                    buckets.popleft()
+
+    @contextmanager
+    def measure(self, name, **values):
+        """
+        Record the duration of a with block. The yielded dict can be filled with more values in the block.
+        """
+        top = time.perf_counter()
+        yield values
+        self.record(name, time.perf_counter() - top, **values)
+
+    def samples(self, name=None, period=None):
+        """
+        :param name: name of the part, None for all the parts
+        :param period: only the samples of the last period seconds, None for all of them
+        :return: A list of the samples, oldest first
+        """
+        with self.lock:
+            samples = list(self.buffer)
+        if period is not None:
+            since = time.perf_counter() - period
+            samples = [sample for sample in samples if sample.time >= since]
+        if name is not None:
+            samples = [sample for sample in samples if sample.name == name]
+        return samples
+
+    def rate(self, name, period=1.0):
+        """
+        :param period: at most RATE_HISTORY
+        :return: The number of samples of the part per second over the last period seconds, even the ones which
+                 were dropped from the buffer
+        """
+        since = time.perf_counter() - period
+        with self.lock:
+            buckets = self.counts.get(name, ())
+            return sum(count for start, count in buckets if start >= since) / period
+
+    def mean(self, name, period=1.0):
+        """
+        :return: The mean duration of the part over the last period seconds, None if it wasn't recorded
+        """
+        samples = self.samples(name, period)
+        if not samples:
+            return None
+        return sum(sample.duration for sample in samples) / len(samples)
+
+    def last(self, name):
+        """
+        :return: The last sample of the part, None if it wasn't recorded
+        """
+        with self.lock:
+            for sample in reversed(self.buffer):
+                if sample.name == name:
+                    return sample
+        return None
+
+    def clear(self):
+        with self.lock:
+            self.buffer.clear()
+            self.counts.clear()
+
+    def dump(self, path):
+        """
+        Write all the samples in a .csv or .json file, a column or key for each value
+
+        :param path: path of the file, its extension gives the format
+        """
+        samples = self.samples()
+        rows = [{"time": sample.time, "name": sample.name, "duration": sample.duration, **sample.values}
+                for sample in samples]
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".json":
+            with open(path, "w") as file:
+                json.dump(rows, file)
+        elif extension == ".csv":
+            columns = ["time", "name", "duration"]
+            for row in rows:
+                columns.extend(key for key in row if key not in columns)
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            raise ValueError(f"Unknown trace format {extension!r}, expected .csv or .json")
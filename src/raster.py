@@ -0,0 +1,98 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import numpy as np
+from PIL import Image, ImageColor
+
+from cellkey import BIAS, LOW, SHIFT
+
+
+def cell_coordinates(keys):
+    """
+    Vectorized cellkey.unpack()
+
+    :param keys: iterable of cells keys
+    :return: Two int64 arrays with the columns and the rows of the cells
+    """
+    keys = np.fromiter(keys, dtype=np.uint64)
+    xs = (keys & np.uint64(LOW)).astype(np.int64) - BIAS
+    ys = (keys >> np.uint64(SHIFT)).astype(np.int64) - BIAS
+    return xs, ys
+
+
+def density(keys, position, scale, cell_size, width, height):
+    """
+    :param keys: iterable of the keys of the cells to draw
+    :param position: Vector2 of the scene coordinates of the top left corner of the image
+    :param scale: Vector2 of the size of the image in scene coordinates
+    :param cell_size: size of a cell in scene coordinates
+    :param width: width of the image in px
+    :param height: height of the image in px
+    :return: A float32 array of shape (height, width) with the proportion of living cells of each pixel
+    """
+    xs, ys = cell_coordinates(keys)
+    cell_width = cell_size * width / scale.x
+    cell_height = cell_size * height / scale.y
+
+    if cell_width >= 1 and cell_height >= 1:
+        # Draw the visible cells one pixel each, then stretch the image to the view
+        x0, y0 = int(position.x // cell_size), int(position.y // cell_size)
+        columns = int(width / cell_width) + 2
+        rows = int(height / cell_height) + 2
+        cells = np.zeros((rows, columns), dtype=np.uint8)
+        inside = (xs >= x0) & (xs < x0 + columns) & (ys >= y0) & (ys < y0 + rows)
+        cells[ys[inside] - y0, xs[inside] - x0] = 255
+
+        box = (
+            position.x / cell_size - x0,
+            position.y / cell_size - y0,
+            (position.x + scale.x) / cell_size - x0,
+            (position.y + scale.y) / cell_size - y0
+        )
+        shades = np.asarray(Image.fromarray(cells).resize((width, height), Image.NEAREST, box=box))
+        shades = shades.astype(np.float32) / 255
+    else:
+        # Several cells per pixel: count the living cells of each pixel
+        px = ((xs * cell_size - position.x) * width / scale.x).astype(np.int64)
+        py = ((ys * cell_size - position.y) * height / scale.y).astype(np.int64)
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        counts = np.bincount(py[inside] * width + px[inside], minlength=width * height)
+        shades = np.minimum(counts.reshape((height, width)) * (cell_width * cell_height), 1).astype(np.float32)
+
+    return shades
+
+
+class Rasterizer:
+
+    def __init__(self, color, background):
+        """
+        Draw cells in a single image instead of one canvas item each, for when they are only a few pixels wide.
+        When a cell is smaller than a pixel, each pixel is shaded by the proportion of living cells it covers.
+
+        :param color: color of the living cells, as a tkinter color name or #rrggbb
+        :param background: color of the dead cells
+        """
+        self.color = np.array(ImageColor.getrgb(color)[:3], dtype=np.float32)
+        self.background = np.array(ImageColor.getrgb(background)[:3], dtype=np.float32)
+
+    def render(self, keys, position, scale, cell_size, width, height):
+        """
+        :param keys: iterable of the keys of the cells to draw
+        :param position: Vector2 of the scene coordinates of the top left corner of the image
+        :param scale: Vector2 of the size of the image in scene coordinates
+        :param cell_size: size of a cell in scene coordinates
+        :param width: width of the image in px
+        :param height: height of the image in px
+        :return: A RGB PIL Image
+        """
+        shades = density(keys, position, scale, cell_size, width, height)
+        pixels = self.background + (self.color - self.background) * shades[..., None]
+        return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
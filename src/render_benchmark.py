@@ -0,0 +1,169 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import argparse
+import json
+import math
+import sys
+import time
+from types import SimpleNamespace
+from tkinter import Tk
+
+from benchmark import environment, summary
+from cell_grid import CellGrid
+from centralwidget import CentralWidget
+from customcanvas import CustomCanvas
+from engine import create_engine
+from settings import (BACKGROUND_COLOR, GRID_COLOR, ACTIVE_CELL_COLOR, CELL_SIZE, MAX_X, MAX_Y, ZOOM_MIN, ZOOM_MAX,
+                      WHEEL_FACTOR)
+from vector2 import Vector2
+
+# Render benchmark of CustomCanvas: N items are drawn, then the view is panned and zoomed frame by frame, timing each
+# frame until Tk has drawn it, and the results are written as JSON. Needs a display, use Xvfb on a headless machine:
+#   xvfb-run python render_benchmark.py --items 1000 10000 100000
+# The "canvas" widget is a bare CustomCanvas holding N rectangles, "cells" a CentralWidget with a CellGrid of N cells.
+
+WIDGETS = ("canvas", "cells")
+ITEMS = (1000, 10000, 100000)
+FRAMES = 120
+WIDTH, HEIGHT = 1024, 760
+# Size in px of the rectangles of the canvas widget
+ITEM_SIZE = 6
+# Pan in px between two frames
+PAN_STEP = 7
+# Number of frames zooming in the same direction, so the zoom limits are never reached
+ZOOM_RUN = 10
+# Redraws are not throttled so each frame is drawn as soon as asked
+UNTHROTTLED = 1_000_000
+
+
+def event(x, y, delta=0):
+    """
+    :return: An object with the attributes of a tkinter Event used by CustomCanvas
+    """
+    return SimpleNamespace(x=x, y=y, delta=delta)
+
+
+def build(root, widget, items):
+    """
+    :return: A canvas of the given kind holding about items items, packed in root
+    """
+    if widget == "canvas":
+        canvas = CustomCanvas(root, zoom_magnitude=WHEEL_FACTOR, frame_rate=UNTHROTTLED, bg=BACKGROUND_COLOR,
+                              highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+        root.update()
+        # A square of rectangles centered on the canvas, larger than it for many items
+        side = math.ceil(math.sqrt(items))
+        left, top = (WIDTH - side * ITEM_SIZE) / 2, (HEIGHT - side * ITEM_SIZE) / 2
+        for i in range(items):
+            x, y = left + (i % side) * ITEM_SIZE, top + (i // side) * ITEM_SIZE
+            canvas.create_rectangle(x, y, x + ITEM_SIZE - 1, y + ITEM_SIZE - 1, fill=ACTIVE_CELL_COLOR, width=0)
+        return canvas
+
+    canvas = CentralWidget(root, bg=BACKGROUND_COLOR, highlightthickness=0, grid_color=GRID_COLOR,
+                           cell_size=CELL_SIZE, maxsize=Vector2(MAX_X, MAX_Y), min_zoom=ZOOM_MIN, max_zoom=ZOOM_MAX,
+                           zoom_magnitude=WHEEL_FACTOR, frame_rate=UNTHROTTLED)
+    cell_grid = CellGrid(canvas, CELL_SIZE, ACTIVE_CELL_COLOR, engine=create_engine("sparse"))
+    canvas.pack(fill="both", expand=True)
+    root.update()
+    # A soup of density 0.5 centered on the view
+    side = math.ceil(math.sqrt(2 * items))
+    center_x, center_y = WIDTH // (2 * CELL_SIZE), HEIGHT // (2 * CELL_SIZE)
+    cell_grid.random_fill(center_x - side // 2, center_y - side // 2, center_x + side // 2, center_y + side // 2,
+                          0.5, seed=1)
+    root.update()
+    return canvas
+
+
+def measure(root, actions):
+    """
+    :param actions: iterable of functions doing one frame of changes
+    :return: The duration of each frame, until Tk has drawn it
+    """
+    latencies = []
+    for action in actions:
+        top = time.perf_counter()
+        action()
+        root.update()
+        latencies.append(time.perf_counter() - top)
+    return latencies
+
+
+def pans(canvas, frames):
+    center_x, center_y = WIDTH // 2, HEIGHT // 2
+    for i in range(frames):
+        # Back and forth so the view stays over the items
+        step = PAN_STEP if (i // (frames // 4 or 1)) % 2 == 0 else -PAN_STEP
+
+        def pan(step=step):
+            canvas.pan_begin(event(center_x, center_y))
+            canvas.pan(event(center_x - step, center_y - step))
+        yield pan
+
+
+def zooms(canvas, frames):
+    center_x, center_y = WIDTH // 2, HEIGHT // 2
+    for i in range(frames):
+        # Out then in again
+        delta = -120 if (i // ZOOM_RUN) % 2 == 0 else 120
+        yield lambda delta=delta: canvas.zoom(event(center_x, center_y, delta))
+
+
+def run_case(widget, items, frames):
+    root = Tk()
+    root.geometry(f"{WIDTH}x{HEIGHT}+0+0")
+    try:
+        top = time.perf_counter()
+        canvas = build(root, widget, items)
+        setup = time.perf_counter() - top
+
+        result = {"widget": widget, "items": items, "frames": frames, "setup_seconds": setup}
+        for name, actions in (("pan", pans), ("zoom", zooms)):
+            latencies = measure(root, actions(canvas, frames))
+            seconds = sum(latencies)
+            result[name] = {
+                "frames_per_second": frames / seconds if seconds else None,
+                "latency_ms": summary(latencies),
+            }
+        result["canvas_items"] = len(canvas.find_all())
+        return result
+    finally:
+        root.destroy()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pans and zooms of the Golpy canvas")
+    parser.add_argument("--widgets", nargs="+", default=list(WIDGETS), choices=WIDGETS)
+    parser.add_argument("--items", nargs="+", type=int, default=ITEMS)
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--output", help="JSON file to write, standard output by default")
+    options = parser.parse_args(arguments)
+
+    results = []
+    for widget in options.widgets:
+        for items in options.items:
+            result = run_case(widget, items, options.frames)
+            results.append(result)
+            print(f"{widget:>7} {items:>8} items  pan {result['pan']['frames_per_second']:8.1f} fps"
+                  f"  zoom {result['zoom']['frames_per_second']:8.1f} fps", file=sys.stderr)
+
+    report = {"environment": environment(), "results": results}
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import re
+
+# Life-like rules in B/S notation: a dead cell with a number of living neighbours listed after B is born, a living
+# cell with a number listed after S survives, all the other cells are dead at the next generation.
+RULES = {
+    "conway": "B3/S23",
+    "highlife": "B36/S23",
+    "day-and-night": "B3678/S34678",
+    "seeds": "B2/S",
+    "life-without-death": "B3/S012345678",
+    "2x2": "B36/S125",
+    "34-life": "B34/S34",
+    "diamoeba": "B35678/S5678",
+    "morley": "B368/S245",
+    "maze": "B3/S12345",
+}
+
+# B3/S23, also accepted as S/B like 23/3
+RULE_PATTERN = re.compile(r"^b([0-8]*)/?s([0-8]*)$|^([0-8]*)/([0-8]*)$")
+
+# Number of cells in a neighbourhood table index, and in a block table index
+NEIGHBOURHOOD_CELLS = 9
+BLOCK_CELLS = 16
+
+# Block tables by rule, computed once
+_block_tables = {}
+
+
+def _ranges(counts):
+    """
+    :param counts: sorted numbers of neighbours
+    :return: A list of the (first, last) bounds of the runs of consecutive numbers
+    """
+    ranges = []
+    for count in counts:
+        if ranges and ranges[-1][1] == count - 1:
+            ranges[-1] = (ranges[-1][0], count)
+        else:
+            ranges.append((count, count))
+    return ranges
+
+
+class Rule:
+
+    def __init__(self, birth=(3,), survival=(2, 3)):
+        """
+        Life-like rule, compiled in the lookup tables used by the engines:
+            -birth and survival: next state of a dead or living cell by number of living neighbours
+            -born_only, survive_only and both: runs of numbers of neighbours giving a living cell only for a dead
+             cell, only for a living cell, or for both, for the engines comparing whole arrays of counts
+            -block_table(): next state of the 2x2 center of a 4x4 block, see block_table()
+
+        :param birth: numbers of living neighbours for a dead cell to be born
+        :param survival: numbers of living neighbours for a living cell to survive
+        """
+        birth, survival = frozenset(birth), frozenset(survival)
+        if not birth | survival <= set(range(9)):
+            raise ValueError("Numbers of neighbours must be between 0 and 8")
+        if 0 in birth:
+            # Every empty cell of the infinite world would be born
+            raise ValueError("Rules with B0 are not supported")
+
+        self.birth = tuple(count in birth for count in range(9))
+        self.survival = tuple(count in survival for count in range(9))
+        self.both = _ranges(sorted(birth & survival))
+        self.born_only = _ranges(sorted(birth - survival))
+        self.survive_only = _ranges(sorted(survival - birth))
+
+    def next_state(self, alive, count):
+        """
+        :param alive: state of the cell
+        :param count: number of living neighbours
+        :return: True if the cell is alive at the next generation
+        """
+        return (self.survival if alive else self.birth)[count]
+
+    def block_table(self):
+        """
+        Table of the next state of the 2x2 center of every 4x4 block, computed on first use.
+        The cell (x, y) of the block is the bit y * 4 + x of the index, the cells (1, 1), (2, 1), (1, 2) and
+        (2, 2) of the result are its bits 0 to 3.
+
+        :return: A bytes object of 2 ** 16 entries
+        """
+        key = str(self)
+        if key not in _block_tables:
+            # Next state of the center of every 3x3 neighbourhood, the cell (dx, dy) being the bit dy * 3 + dx
+            table = bytes(
+                (self.survival if index & 0b10000 else self.birth)[bin(index & ~0b10000).count("1")]
+                for index in range(1 << NEIGHBOURHOOD_CELLS)
+            )
+            entries = bytearray(1 << BLOCK_CELLS)
+            for block in range(1 << BLOCK_CELLS):
+                result = 0
+                for bit, (x, y) in enumerate(((1, 1), (2, 1), (1, 2), (2, 2))):
+                    # 3x3 neighbourhood of (x, y), row by row
+                    index = 0
+                    for dy in range(3):
+                        row = (block >> ((y - 1 + dy) * 4 + x - 1)) & 0b111
+                        index |= row << (dy * 3)
+                    result |= table[index] << bit
+                entries[block] = result
+            _block_tables[key] = bytes(entries)
+        return _block_tables[key]
+
+    def __str__(self):
+        return (f"B{''.join(str(count) for count in range(9) if self.birth[count])}"
+                f"/S{''.join(str(count) for count in range(9) if self.survival[count])}")
+
+    def __repr__(self):
+        return f"Rule({str(self)!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and (self.birth, self.survival) == (other.birth, other.survival)
+
+    def __hash__(self):
+        return hash((self.birth, self.survival))
+
+
+def parse(rule=None):
+    """
+    :param rule: B/S string like "B36/S23", S/B string like "23/36", name of RULES, Rule, or None for Conway's rule
+    :return: The Rule
+    """
+    if rule is None:
+        return CONWAY
+    if isinstance(rule, Rule):
+        return rule
+
+    text = RULES.get(rule.strip().lower(), rule).strip().lower().replace(" ", "")
+    match = RULE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid rule {rule!r}, expected B/S notation like B3/S23 or one of {', '.join(RULES)}")
+
+    if match.group(3) is not None:
+        survival, birth = match.group(3), match.group(4)
+    else:
+        birth, survival = match.group(1), match.group(2)
+    return Rule(map(int, birth), map(int, survival))
+
+
+CONWAY = Rule()
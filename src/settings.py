@@ -14,7 +14,33 @@ ACTIVE_CELL_COLOR = "#a0a0a0"
 # Size (in px) of the cells with default zoom_factor
 CELL_SIZE = 32
 
-# Area Limits
+# Simulation engine, see engine.ENGINES: "tiled" skips the still parts of the world, "sparse" computes it all,
+# "dense" (needs numpy) for crowded soups, "bitboard" (needs numpy) for the largest patterns,
+# "hashlife" for long runs of repetitive patterns, "paged" for patterns too large for the memory
+ENGINE = "tiled"
+
+# Life-like rule in B/S notation like "B36/S23", or a name of rules.RULES like "highlife"
+RULE = "conway"
+
+# Redraws per second while simulating, and maximum number of frames waiting to be drawn
+FRAME_RATE = 60
+RENDER_QUEUE_SIZE = 4
+
+# Stop the simulation when the board repeats itself, like still lifes, oscillators and spaceships
+PAUSE_ON_CYCLE = True
+
+# Record the simulated generations in a temporary file, to go back and forth with Page Up and Page Down by
+# HISTORY_STEP generations
+HISTORY = True
+HISTORY_STEP = 100
+
+# Count the still lifes, oscillators and spaceships of the board while simulating, shown with F3
+CENSUS = True
+
+# Size (in px) of the cells under which they are drawn in a single image (needs numpy)
+RASTER_CELL_SIZE = 4
+
+# Area Limits, which may be raised up to 2 ** 31 with the "paged" engine since its cells are on disk
 MAX_X = 65536
 MAX_Y = 65536
 
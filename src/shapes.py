@@ -0,0 +1,106 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from cycles import CycleDetector
+from engine import Engine
+
+# Objects of a board: groups of close cells, identified by running them alone until they repeat. Their names and
+# canonical forms are shared by the soup search of census.py and the live census of analysis.py.
+
+# Longest period of the objects recognized
+MAX_PERIOD = 30
+# Cells closer than this (in both directions) belong to the same object
+OBJECT_DISTANCE = 2
+# Name prefix of the objects dying when run alone
+DIES = "dies"
+# Rotations and reflections, as the (a, b, c, d) of (x, y) -> (a * x + b * y, c * x + d * y)
+TRANSFORMS = (
+    (1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0),
+    (-1, 0, 0, 1), (0, 1, 1, 0), (1, 0, 0, -1), (0, -1, -1, 0),
+)
+
+
+def objects(cells, distance=OBJECT_DISTANCE):
+    """
+    :param cells: set of the (x, y) coordinates of living cells
+    :return: A list of sets of cells, each one holding the cells closer than distance to another one of the set
+    """
+    around = [(dx, dy) for dx in range(-distance, distance + 1) for dy in range(-distance, distance + 1) if dx or dy]
+    left = set(cells)
+    groups = []
+    while left:
+        stack = [left.pop()]
+        group = set(stack)
+        while stack:
+            x, y = stack.pop()
+            for dx, dy in around:
+                cell = (x + dx, y + dy)
+                if cell in left:
+                    left.remove(cell)
+                    group.add(cell)
+                    stack.append(cell)
+        groups.append(group)
+    return groups
+
+
+def pattern_code(cells):
+    """
+    :param cells: iterable of (x, y) coordinates
+    :return: The cells moved to (0, 0), as the hexadecimal bit masks of their rows separated by "-"
+    """
+    cells = list(cells)
+    min_x = min(x for x, _ in cells)
+    min_y = min(y for _, y in cells)
+    rows = [0] * (max(y for _, y in cells) - min_y + 1)
+    for x, y in cells:
+        rows[y - min_y] |= 1 << (x - min_x)
+    return "-".join(f"{row:x}" for row in rows)
+
+
+def canonical(cells):
+    """
+    :param cells: iterable of (x, y) coordinates
+    :return: The smallest pattern_code() of the cells rotated and reflected, the same for all the orientations
+    """
+    cells = list(cells)
+    return min(pattern_code([(a * x + b * y, c * x + d * y) for x, y in cells]) for a, b, c, d in TRANSFORMS)
+
+
+def classify(cells, rule=None, max_period=MAX_PERIOD):
+    """
+    Identify an object by running it alone until it repeats
+
+    :param cells: set of the (x, y) coordinates of the object
+    :return: Its name: xs<population> for still lifes, xp<period> for oscillators and xq<period> for spaceships,
+             then "_" and the smallest canonical() form of its phases. "unknown_" and its population if it doesn't
+             repeat within max_period generations, "dies_" and its population if it dies.
+    """
+    engine = Engine(cells, rule)
+    detector = CycleDetector(engine, max_period + 1)
+    codes = [canonical(cells)]
+    for _ in range(max_period):
+        engine.step()
+        if not engine.population:
+            # Empty boards have no canonical form
+            return f"{DIES}_{len(cells)}"
+        cycle = detector.update()
+        if cycle is not None:
+            break
+        codes.append(canonical(engine.cells()))
+    else:
+        return f"unknown_{len(cells)}"
+
+    if cycle.period == 1 and not (cycle.dx or cycle.dy):
+        prefix = f"xs{len(cells)}"
+    elif cycle.dx or cycle.dy:
+        prefix = f"xq{cycle.period}"
+    else:
+        prefix = f"xp{cycle.period}"
+    return f"{prefix}_{min(codes[cycle.start:])}"
@@ -0,0 +1,127 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+from queue import Queue, Full, Empty
+from threading import Thread, Event, Lock
+
+from cycles import CycleDetector
+from engine import merge_changes
+
+
+class SimulationThread(Thread):
+
+    def __init__(self, engine, speed, queue_size=4, history=None, detect_cycles=False, profiler=None,
+                 census=None, stats=None):
+        """
+        Run an engine in a background thread so the tkinter main loop only has to draw.
+
+        Each generation's births and deaths are pushed in a bounded queue. When the queue is full the changes
+        are merged with the next generation's ones instead of blocking, so the simulation never waits for the
+        renderer and the renderer only draws the newest state (see changes()).
+
+        :param engine: engine to run, it shouldn't be used by another thread until the simulation is stopped
+        :param speed: function returning the wanted number of generations per second, float("inf") for as fast
+                      as possible
+        :param queue_size: maximum number of frames waiting to be drawn
+        :param history: checkpoint.History recording each generation, None to record nothing
+        :param detect_cycles: True to stop as soon as the board comes back to a recent state, see cycle
+        :param profiler: profiler.Profiler recording the steps, None to record nothing
+        :param census: analysis.Census updated with each generation, None to count nothing
+        :param stats: stats.Stats updated with each generation, None to keep no statistics
+        """
+        Thread.__init__(self, daemon=True)
+        self.engine = engine
+        self.speed = speed
+        self.history = history
+        self.profiler = profiler
+        self.census = census
+        self.stats = stats
+        self.detector = CycleDetector(engine) if detect_cycles else None
+        # Cycle found by the detector, the thread then stops by itself
+        self.cycle = None
+        self.queue = Queue(queue_size)
+        self.stopping = Event()
+        # Changes which didn't fit in the queue yet
+        self.pending = None
+        self.lock = Lock()
+
+    def run(self):
+        while not self.stopping.is_set():
+            top = time.perf_counter()
+            self.engine.step()
+            stepped = time.perf_counter()
+            births, deaths = self.engine.births, self.engine.deaths
+            if self.profiler is not None:
+                self.profiler.record("step", stepped - top, population=self.engine.population,
+                                     births=len(births), deaths=len(deaths), queue=self.queue.qsize())
+                self.profiler.record("changes", time.perf_counter() - stepped)
+
+            if self.history is not None:
+                self.history.record(self.engine)
+            if self.stats is not None:
+                self.stats.update(births, deaths, self.engine.generation)
+            if self.census is not None:
+                counting = time.perf_counter()
+                self.census.update(births, deaths)
+                if self.profiler is not None:
+                    self.profiler.record("census", time.perf_counter() - counting, objects=len(self.census))
+            self.__push(births, deaths)
+            if self.detector is not None:
+                self.cycle = self.detector.update()
+                if self.cycle is not None:
+                    break
+
+            delay = 1 / self.speed() - time.perf_counter() + top
+            if delay > 0:
+                self.stopping.wait(delay)
+
+    def __push(self, births, deaths):
+        with self.lock:
+            if self.pending is None:
+                self.pending = (set(births), set(deaths))
+            else:
+                merge_changes(*self.pending, births, deaths)
+
+            try:
+                self.queue.put_nowait(self.pending)
+                self.pending = None
+            except Full:
+                pass
+
+    def stop(self):
+        """
+        Stop the simulation after the current generation and wait for it
+        """
+        self.stopping.set()
+        self.join()
+
+    def changes(self):
+        """
+        Merge all the frames waiting in the queue, dropping the intermediate states.
+        Once the thread is stopped, the changes which didn't fit in the queue are merged as well.
+
+        :return: The births and deaths since the last call
+        """
+        births, deaths = set(), set()
+        while True:
+            try:
+                frame = self.queue.get_nowait()
+            except Empty:
+                break
+            merge_changes(births, deaths, *frame)
+
+        if not self.is_alive():
+            with self.lock:
+                if self.pending is not None:
+                    merge_changes(births, deaths, *self.pending)
+                    self.pending = None
+
+        return births, deaths
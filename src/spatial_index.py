@@ -0,0 +1,74 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from cellkey import BIAS, LOW, SHIFT, tile_of
+
+# Buckets are squares of 2 ** BUCKET_SHIFT cells side
+BUCKET_SHIFT = 6
+
+
+class SpatialIndex:
+
+    def __init__(self, keys=()):
+        """
+        Living cells grouped by square buckets, to find the cells of an area without looking at the others
+
+        :param keys: iterable of the initial cells keys
+        """
+        self.buckets = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        bucket = tile_of(key, BUCKET_SHIFT)
+        if bucket in self.buckets:
+            self.buckets[bucket].add(key)
+        else:
+            self.buckets[bucket] = {key}
+
+    def remove(self, key):
+        bucket = tile_of(key, BUCKET_SHIFT)
+        cells = self.buckets.get(bucket)
+        if cells is not None:
+            cells.discard(key)
+            if not cells:
+                del self.buckets[bucket]
+
+    def clear(self):
+        self.buckets.clear()
+
+    def __len__(self):
+        return sum(len(cells) for cells in self.buckets.values())
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """
+        :return: An iterator over the keys of the cells in the box, bounds included
+        """
+        low_x, low_y = (min_x + BIAS) >> BUCKET_SHIFT, (min_y + BIAS) >> BUCKET_SHIFT
+        high_x, high_y = (max_x + BIAS) >> BUCKET_SHIFT, (max_y + BIAS) >> BUCKET_SHIFT
+        min_key_x, max_key_x = min_x + BIAS, max_x + BIAS
+        min_key_y, max_key_y = min_y + BIAS, max_y + BIAS
+
+        # Look for the buckets in the box, or for the box in the buckets when there are fewer buckets
+        if (high_x - low_x + 1) * (high_y - low_y + 1) <= len(self.buckets):
+            buckets = ((by << SHIFT) | bx for by in range(low_y, high_y + 1) for bx in range(low_x, high_x + 1))
+        else:
+            buckets = [
+                bucket for bucket in self.buckets
+                if low_y <= bucket >> SHIFT <= high_y and low_x <= bucket & LOW <= high_x
+            ]
+
+        for bucket in buckets:
+            cells = self.buckets.get(bucket)
+            if cells is None:
+                continue
+            for key in cells:
+                if min_key_x <= key & LOW <= max_key_x and min_key_y <= key >> SHIFT <= max_key_y:
+                    yield key
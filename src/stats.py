@@ -0,0 +1,147 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from collections import deque, namedtuple
+from heapq import heappop, heappush
+
+from cellkey import unpack
+
+# Population and numbers of births and deaths of a generation
+Point = namedtuple("Point", "generation population births deaths")
+# Number of generations kept in the time series
+SERIES_LENGTH = 4096
+# Number of emptied rows kept in the heaps of an Extent before rebuilding them
+STALE_ROWS = 64
+
+
+class Extent:
+
+    def __init__(self):
+        """
+        Numbers of living cells by row (or by column), with the lowest and highest non empty rows.
+        The rows are kept in a min heap and a max heap, each one once, and emptied rows are only dropped when they
+        reach the top, so a change costs O(log(rows)) at most.
+        """
+        self.counts = {}
+        self.low, self.high = [], []
+        # Rows in each heap, emptied or not
+        self.in_low, self.in_high = set(), set()
+
+    def add(self, row):
+        count = self.counts.get(row, 0)
+        self.counts[row] = count + 1
+        if not count:
+            if row not in self.in_low:
+                heappush(self.low, row)
+                self.in_low.add(row)
+            if row not in self.in_high:
+                heappush(self.high, -row)
+                self.in_high.add(row)
+
+    def remove(self, row):
+        count = self.counts[row] - 1
+        if count:
+            self.counts[row] = count
+            return
+
+        del self.counts[row]
+        # Rows crossed by a moving pattern would stay in the heaps forever
+        if len(self.in_low) > 2 * len(self.counts) + STALE_ROWS:
+            self.low = sorted(self.counts)
+            self.high = sorted(-row for row in self.counts)
+            self.in_low, self.in_high = set(self.counts), set(self.counts)
+
+    def first(self):
+        """
+        :return: The lowest non empty row, None if there is none
+        """
+        low = self.low
+        while low and low[0] not in self.counts:
+            self.in_low.discard(heappop(low))
+        return low[0] if low else None
+
+    def last(self):
+        """
+        :return: The highest non empty row, None if there is none
+        """
+        high = self.high
+        while high and -high[0] not in self.counts:
+            self.in_high.discard(-heappop(high))
+        return -high[0] if high else None
+
+
+class Stats:
+
+    def __init__(self, keys=(), generation=0, length=SERIES_LENGTH):
+        """
+        Population, bounding box and numbers of births and deaths of the board, kept up to date from the changes of
+        each generation instead of looking at all the living cells.
+
+        The attributes are replaced at the end of each update, so another thread may read them while updating.
+
+        :param keys: iterable of the keys of the living cells
+        :param generation: generation of the cells
+        :param length: number of generations kept in the time series
+        """
+        # Last generations, as Point
+        self.series = deque(maxlen=length)
+        self.reset(keys, generation)
+
+    def reset(self, keys=(), generation=0):
+        """
+        Forget all the cells and the time series, and count new cells
+        """
+        self.rows, self.columns = Extent(), Extent()
+        self.population = 0
+        self.generation = generation
+        # Numbers of births and deaths of the last generation
+        self.births = self.deaths = 0
+        # (min_x, min_y, max_x, max_y) of the living cells, None if there is none
+        self.bounding_box = None
+        self.series.clear()
+        self.update(keys, ())
+
+    def update(self, births, deaths, generation=None):
+        """
+        :param births: keys of the cells born since the last update
+        :param deaths: keys of the cells dead since the last update
+        :param generation: generation reached, adding a point to the time series, None for an edit of the cells
+        """
+        rows, columns = self.rows, self.columns
+        born = dead = 0
+        for key in births:
+            x, y = unpack(key)
+            columns.add(x)
+            rows.add(y)
+            born += 1
+        for key in deaths:
+            x, y = unpack(key)
+            columns.remove(x)
+            rows.remove(y)
+            dead += 1
+
+        self.population += born - dead
+        if self.population:
+            self.bounding_box = (columns.first(), rows.first(), columns.last(), rows.last())
+        else:
+            self.bounding_box = None
+        if generation is not None:
+            self.generation, self.births, self.deaths = generation, born, dead
+            self.series.append(Point(generation, self.population, born, dead))
+
+    def populations(self, count=None):
+        """
+        :param count: number of generations, all the recorded ones by default
+        :return: A list of the populations of the last generations, oldest first
+        """
+        points = list(self.series)
+        if count is not None:
+            points = points[-count:]
+        return [point.population for point in points]
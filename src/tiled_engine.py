@@ -0,0 +1,163 @@
+"""
+Copyright © 2021 Erkstone
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+from cellkey import AROUND, tile_of as _tile_of
+from engine import Engine
+
+# Tiles are squares of 2 ** TILE_SHIFT cells side
+TILE_SHIFT = 5
+# Offsets of a cell or tile and its eight neighbours
+TILE_AROUND = (0,) + AROUND
+
+_NO_CHANGES = (frozenset(), frozenset())
+
+
+def tile_of(key):
+    """
+    :param key: key of a cell
+    :return: The key of its tile, packed like a cell key with tile coordinates
+    """
+    return _tile_of(key, TILE_SHIFT)
+
+
+class TiledEngine(Engine):
+
+    def __init__(self, cells=(), rule=None):
+        """
+        Sparse engine which skips the parts of the world that can't change.
+
+        The world is divided in tiles of 32x32 cells, tracked from the births and deaths of the last two generations:
+            -stable tiles didn't change, nor their neighbours, so they are skipped
+            -period-2 tiles and their neighbours are back to their state of two generations ago, so they replay
+             the changes of the previous generation without computing anything
+            -active tiles are computed, only for the cells next to a cell which changed in the last generation
+        The cost of a generation thus depends on the activity of the world and not on its population.
+
+        Same API as engine.Engine.
+
+        :param cells: iterable of the initial living cells (x, y) coordinates
+        :param rule: Life-like rule, see rules.parse(), Conway's rule by default
+        """
+        # Births and deaths by tile of the last and previous generations
+        self.changes = {}
+        self.previous_changes = {}
+        # Cells edited with add() or remove() since the last generation
+        self.edited = set()
+        self.active_tiles = set()
+        self.period2_tiles = set()
+
+        Engine.__init__(self, cells, rule)
+
+    def add(self, key):
+        if key not in self.active_cells:
+            Engine.add(self, key)
+            self.edited.add(key)
+
+    def remove(self, key):
+        if key in self.active_cells:
+            Engine.remove(self, key)
+            self.edited.add(key)
+
+    def clear(self):
+        born, dead = Engine.clear(self)
+        self.changes, self.previous_changes = {}, {}
+        self.edited.clear()
+        self.active_tiles, self.period2_tiles = set(), set()
+        return born, dead
+
+    def _apply(self, born, dead):
+        Engine._apply(self, born, dead)
+        self.edited |= born
+        self.edited |= dead
+
+    def tile_state(self, tile):
+        """
+        :param tile: key of a tile, see tile_of()
+        :return: "active", "period-2" or "stable", as tracked in the last generation
+        """
+        if tile in self.active_tiles:
+            return "active"
+        if tile in self.period2_tiles:
+            return "period-2"
+        return "stable"
+
+    def __is_quiet(self, tile, edited_tiles):
+        """
+        :return: True if the tile is back to its state of two generations ago
+        """
+        if tile in edited_tiles:
+            return False
+        born, dead = self.changes.get(tile, _NO_CHANGES)
+        previous_born, previous_dead = self.previous_changes.get(tile, _NO_CHANGES)
+        return born == previous_dead and dead == previous_born
+
+    def _update(self):
+        active, mask = self.active_cells, self.mask.mask
+        birth, survival = self.rule.birth, self.rule.survival
+        changes, previous_changes = self.changes, self.previous_changes
+        edited_tiles = {tile_of(key) for key in self.edited}
+
+        # Tiles next to a tile which is not back to its state of two generations ago have to be computed,
+        # the other ones which changed replay the previous generation, and the others are stable
+        restless = edited_tiles | {
+            tile for tile in changes.keys() | previous_changes.keys()
+            if not self.__is_quiet(tile, edited_tiles)
+        }
+        compute = {tile + around for tile in restless for around in TILE_AROUND}
+        replay = [tile for tile in previous_changes if tile not in compute]
+
+        # A cell may only change if a cell next to it changed
+        near = {tile + around for tile in compute for around in TILE_AROUND}
+        changed = [key for key in self.edited if tile_of(key) in near]
+        for tile, (tile_born, tile_dead) in changes.items():
+            if tile in near:
+                changed.extend(tile_born)
+                changed.extend(tile_dead)
+
+        if len(changed) * len(TILE_AROUND) < len(mask):
+            born, dead = [], []
+            for key in {key + around for key in changed for around in TILE_AROUND}:
+                count = mask.get(key, 0)
+                if key in active:
+                    if not survival[count]:
+                        dead.append(key)
+                elif birth[count]:
+                    born.append(key)
+        else:
+            # Most of the world is changing, scanning it all is cheaper
+            born = [key for key, count in mask.items() if birth[count] and key not in active]
+            dead = [key for key in active if not survival[mask.get(key, 0)]]
+
+        # Group the computed changes by tile, the rule gives the same changes as the replay in the other tiles
+        new_changes = {}
+        for index, keys in enumerate((born, dead)):
+            for key in keys:
+                tile = tile_of(key)
+                if tile in compute:
+                    new_changes.setdefault(tile, (set(), set()))[index].add(key)
+        for tile in replay:
+            new_changes[tile] = previous_changes[tile]
+
+        born, dead = [], []
+        for tile_born, tile_dead in new_changes.values():
+            born.extend(tile_born)
+            dead.extend(tile_dead)
+
+        for key in born:
+            Engine.add(self, key)
+        for key in dead:
+            Engine.remove(self, key)
+
+        self.previous_changes, self.changes = changes, new_changes
+        self.edited.clear()
+        self.active_tiles = {tile for tile in compute if tile in new_changes}
+        self.period2_tiles = set(replay)
+        self.generation += 1
+        return born, dead
@@ -12,6 +12,7 @@ from math import sqrt, cos, sin, atan2
 
 
 class Vector2:
+    __slots__ = ("x", "y")
 
     def __init__(self, x, y):
         """ Basic 2D Vector"""
@@ -98,10 +99,12 @@ class Vector2:
         return f"{self.x : <6_.0f}{self.y : <6_.0f}"
 
     def __hash__(self):
-        return hash(str(self))
+        return hash((self.x, self.y))
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        if not isinstance(other, Vector2):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
 
     @staticmethod
     def cross_product(vector_a, vector_b):
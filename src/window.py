@@ -8,22 +8,48 @@ The above copyright notice and this permission notice shall be included in all c
 THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-from tkinter import Tk, Button, Frame, LabelFrame
+import os
+import tempfile
+from tkinter import Tk, Button, Frame, LabelFrame, filedialog, messagebox
 from settings import *
 from centralwidget import *
+from engine import create_engine
 from PIL import ImageTk, Image
+import patterns
+from profiler import Profiler
+from analysis import Census
+from stats import Stats
+from checkpoint import History
+from rules import parse
+
+# File types proposed by the Open and Save dialogs
+PATTERN_FILETYPES = (
+    ("Patterns", " ".join(f"*{extension}" for extension in patterns.FORMATS)),
+    ("All files", "*")
+)
+# File types proposed to save the profiler samples
+TRACE_FILETYPES = (("CSV", "*.csv"), ("JSON", "*.json"))
 
 
 class Window(Tk):
 
     def __init__(self):
         """
-        Main Window of the app, with only a constructor
+        Main Window of the app
         """
         Tk.__init__(self)
         self.title("Golpy")
         self.geometry(f"{WIDTH}x{HEIGHT}+{WINDOW_X}+{WINDOW_Y}")
 
+        # Timings of the simulation and the rendering, shown with F3 and saved with F4
+        self.profiler = Profiler()
+        # Generations recorded while simulating, in a temporary file removed with the window
+        self.history = None
+        if HISTORY:
+            descriptor, path = tempfile.mkstemp(prefix="golpy-", suffix=".history")
+            os.close(descriptor)
+            self.history = History(path)
+
         # Create the central widget and make it expand
         self.central = CentralWidget(self,
                                      bg=BACKGROUND_COLOR,
@@ -33,8 +59,20 @@ class Window(Tk):
                                      maxsize=Vector2(MAX_X, MAX_Y),
                                      min_zoom=ZOOM_MIN,
                                      max_zoom=ZOOM_MAX,
-                                     zoom_magnitude=WHEEL_FACTOR)
-        self.cell_grid = CellGrid(self.central, CELL_SIZE, ACTIVE_CELL_COLOR)
+                                     zoom_magnitude=WHEEL_FACTOR,
+                                     frame_rate=FRAME_RATE,
+                                     profiler=self.profiler)
+        self.cell_grid = CellGrid(self.central, CELL_SIZE, ACTIVE_CELL_COLOR,
+                                  engine=create_engine(ENGINE, rule=RULE),
+                                  frame_rate=FRAME_RATE,
+                                  queue_size=RENDER_QUEUE_SIZE,
+                                  raster_cell_size=RASTER_CELL_SIZE,
+                                  pause_on_cycle=PAUSE_ON_CYCLE,
+                                  on_cycle=self.show_cycle,
+                                  profiler=self.profiler,
+                                  history=self.history,
+                                  census=Census(rule=RULE) if CENSUS else None,
+                                  stats=Stats())
         self.rowconfigure(2, weight=1)
         self.columnconfigure(2, weight=1)
         self.central.grid(row=2, column=2, sticky='nsew')
@@ -50,7 +88,7 @@ class Window(Tk):
                              image=render_play_image,
                              text="Play/Stop",
                              compound="left",
-                             command=self.cell_grid.start_stop)
+                             command=self.start_stop)
         play_button.image = render_play_image
         play_button.grid(row=0, column=0, sticky="nsew", padx=5)
 
@@ -63,7 +101,123 @@ class Window(Tk):
         Button(speed_frame, text="  -  ", command=self.cell_grid.speed_down).grid(row=0, column=1, sticky="nsew", padx=2)
         speed_frame.grid(row=0, column=1, padx=5, sticky="ns")
 
+        # Buttons to load and save patterns in their own Frame
+        pattern_frame = LabelFrame(button_frame, text="Pattern")
+        Button(pattern_frame, text="Open", command=self.open_pattern).grid(row=0, column=0, sticky="nsew", padx=2)
+        Button(pattern_frame, text="Save", command=self.save_pattern).grid(row=0, column=1, sticky="nsew", padx=2)
+        pattern_frame.grid(row=0, column=2, padx=5, sticky="ns")
+
         button_frame.grid(row=1, column=2, sticky='nsew')
 
         # Bind to mouse left click on the central widget to add or remove living cells
         self.central.bind("<Button-1>", self.central.change_state)
+        self.bind("<Home>", self.central.zoom_to_fit)
+        self.bind("<Prior>", lambda event: self.seek(-HISTORY_STEP))
+        self.bind("<Next>", lambda event: self.seek(HISTORY_STEP))
+        self.bind("<F3>", self.central.toggle_hud)
+        self.bind("<F4>", lambda event: self.save_trace())
+
+    def start_stop(self):
+        self.title("Golpy")
+        self.cell_grid.start_stop()
+
+    def seek(self, generations):
+        """
+        Go back or forward in the recorded generations, while paused
+
+        :param generations: number of generations to move by, negative to go back
+        """
+        if self.cell_grid.simulating:
+            return
+
+        try:
+            self.cell_grid.seek(max(0, self.cell_grid.engine.generation + generations))
+        except ValueError:
+            # Nothing recorded yet
+            return
+        self.title(f"Golpy - generation {self.cell_grid.engine.generation}")
+
+    def destroy(self):
+        if self.cell_grid.simulating:
+            self.cell_grid.start_stop()
+        if self.history is not None:
+            self.history.close()
+            os.remove(self.history.path)
+        Tk.destroy(self)
+
+    def show_cycle(self, cycle):
+        """
+        Show the cycle the simulation stopped on in the title
+        """
+        if cycle.dx or cycle.dy:
+            self.title(f"Golpy - moving by ({cycle.dx}, {cycle.dy}) every {cycle.period} generations")
+        elif cycle.period == 1:
+            self.title(f"Golpy - still since generation {cycle.start}")
+        else:
+            self.title(f"Golpy - period {cycle.period} since generation {cycle.start}")
+
+    def open_pattern(self):
+        """
+        Ask for a pattern file and replace the living cells with it
+        """
+        if not self.__paused("open"):
+            return
+
+        path = filedialog.askopenfilename(filetypes=PATTERN_FILETYPES)
+        if not path:
+            return
+
+        try:
+            self.cell_grid.load(patterns.read(path))
+            rule = patterns.read_rule(path)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Golpy", f"Can't open {path}: {error}")
+            return
+
+        # The rule of the engine is set in the settings, a pattern made for another one may behave differently
+        try:
+            rule = parse(rule) if rule else None
+        except ValueError:
+            pass
+        if rule is not None and rule != self.cell_grid.engine.rule:
+            messagebox.showwarning("Golpy", f"{path} is a {rule} pattern, simulated with {self.cell_grid.engine.rule}")
+
+    def save_pattern(self):
+        """
+        Ask for a pattern file and save the living cells in it
+        """
+        # The simulation thread changes the cells while they are written otherwise
+        if not self.__paused("save"):
+            return
+
+        path = filedialog.asksaveasfilename(filetypes=PATTERN_FILETYPES, defaultextension=".rle")
+        if not path:
+            return
+
+        try:
+            patterns.write(path, self.cell_grid.engine.cells(), self.cell_grid.engine.rule)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Golpy", f"Can't save {path}: {error}")
+
+    def __paused(self, action):
+        """
+        :param action: "open" or "save", for the message shown while simulating
+        :return: True if the simulation is paused, else tell the user to pause it
+        """
+        if self.cell_grid.simulating:
+            messagebox.showinfo("Golpy", f"Pause the simulation to {action} a pattern")
+            return False
+        return True
+
+    def save_trace(self):
+        """
+        Ask for a .csv or .json file and save the samples of the profiler in it
+        """
+        path = filedialog.asksaveasfilename(filetypes=TRACE_FILETYPES, defaultextension=".csv")
+        if not path:
+            return
+
+        try:
+            self.profiler.dump(path)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Golpy", f"Can't save {path}: {error}")